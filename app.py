@@ -3,25 +3,64 @@
 Job Recommendation FastAPI Application
 """
 
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Optional
-import uvicorn
-from dotenv import load_dotenv
-import os
+from startup import StartupReport
 
-from models import JobRecommendationRequest, JobRecommendationResponse, JobData
-from services import JobRecommendationService
+# Created first so the report covers every import below
+startup_report = StartupReport()
+
+with startup_report.measure_imports():
+    from contextlib import asynccontextmanager
+    from fastapi import FastAPI, HTTPException, Request
+    from fastapi.responses import Response, StreamingResponse
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest, multiprocess
+    from fastapi.middleware.cors import CORSMiddleware
+    from dotenv import load_dotenv
+    import json
+    import os
+    import time
+
+    from models import (
+        JobRecommendationRequest,
+        JobRecommendationResponse,
+        JobData,
+        RunStatus,
+        BatchJobRecommendationRequest,
+        BatchJobRecommendationResponse
+    )
+    from services import JobRecommendationService, job_fields
+    from runs import RunManager, QueueFullError
+    from metrics import MetricsMiddleware, ServiceStatsCollector
+    from compression import CompressionMiddleware
+    from usage import track_usage
 
 # Load environment variables
 load_dotenv()
 
+# Initialize service; upstream clients are created in the lifespan hook or on first use
+with startup_report.phase("service_init"):
+    job_service = JobRecommendationService()
+    run_manager = RunManager.from_env(job_service)
+    REGISTRY.register(ServiceStatsCollector(job_service))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open pooled upstream clients and start run workers at startup; stop them at shutdown"""
+    with startup_report.phase("lifespan"):
+        await job_service.startup()
+        await run_manager.start()
+    startup_report.mark_ready()
+    yield
+    await run_manager.stop()
+    await job_service.shutdown()
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Job Recommendation API",
     description="AI-powered job recommendation system that analyzes resumes against job postings",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -33,8 +72,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize service
-job_service = JobRecommendationService()
+# Compress large JSON responses for clients that accept gzip or brotli; streams are left as they are
+app.add_middleware(CompressionMiddleware, **CompressionMiddleware.options_from_env())
+
+# Track in-flight requests and latency per route for /metrics
+app.add_middleware(MetricsMiddleware)
 
 @app.get("/")
 async def root():
@@ -58,7 +100,9 @@ async def recommend_jobs(request: JobRecommendationRequest):
             resume_text=request.resume_text,
             jobs_page_url=request.jobs_page_url,
             num_jobs=request.num_jobs,
-            num_recommendations=request.num_recommendations
+            num_recommendations=request.num_recommendations,
+            shortlist_size=request.shortlist_size,
+            include_jobs=request.include_jobs
         )
         
         return result
@@ -66,6 +110,101 @@ async def recommend_jobs(request: JobRecommendationRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
 
+@app.post("/recommend-jobs/batch", response_model=BatchJobRecommendationResponse)
+async def recommend_jobs_batch(request: BatchJobRecommendationRequest):
+    """
+    Rank one job board against many resumes, scraping and extracting the board only once
+    """
+    try:
+        # Validate API keys
+        if not os.getenv("OPENAI_API_KEY"):
+            raise HTTPException(status_code=500, detail="OpenAI API key not configured")
+        if not os.getenv("FIRECRAWL_API_KEY"):
+            raise HTTPException(status_code=500, detail="Firecrawl API key not configured")
+        
+        return await job_service.get_batch_job_recommendations(
+            resumes=request.resumes,
+            jobs_page_url=request.jobs_page_url,
+            num_jobs=request.num_jobs,
+            num_recommendations=request.num_recommendations,
+            shortlist_size=request.shortlist_size,
+            include_jobs=request.include_jobs
+        )
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing batch request: {str(e)}")
+
+@app.post("/recommend-jobs/stream")
+async def recommend_jobs_stream(request: JobRecommendationRequest, http_request: Request):
+    """
+    Stream job recommendation progress: found links, each extracted job, then each recommendation.
+
+    Responds with Server-Sent Events when the client accepts text/event-stream, NDJSON otherwise.
+    """
+    # Validate API keys before the stream starts so errors still get a proper status code
+    if not os.getenv("OPENAI_API_KEY"):
+        raise HTTPException(status_code=500, detail="OpenAI API key not configured")
+    if not os.getenv("FIRECRAWL_API_KEY"):
+        raise HTTPException(status_code=500, detail="Firecrawl API key not configured")
+    
+    use_sse = "text/event-stream" in http_request.headers.get("accept", "")
+    
+    async def event_stream():
+        async for event in job_service.stream_job_recommendations(
+            resume_text=request.resume_text,
+            jobs_page_url=request.jobs_page_url,
+            num_jobs=request.num_jobs,
+            num_recommendations=request.num_recommendations,
+            shortlist_size=request.shortlist_size,
+            include_jobs=request.include_jobs
+        ):
+            if use_sse:
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+            else:
+                yield json.dumps(event) + "\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        # Tell nginx not to buffer so each event reaches the client immediately
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/runs", response_model=RunStatus, status_code=202)
+async def submit_run(request: JobRecommendationRequest):
+    """
+    Enqueue a recommendation run for a background worker and return its run id immediately
+    """
+    if not os.getenv("OPENAI_API_KEY"):
+        raise HTTPException(status_code=500, detail="OpenAI API key not configured")
+    if not os.getenv("FIRECRAWL_API_KEY"):
+        raise HTTPException(status_code=500, detail="Firecrawl API key not configured")
+    
+    try:
+        return await run_manager.submit(request)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+
+@app.get("/runs/{run_id}", response_model=RunStatus)
+async def get_run_status(run_id: str):
+    """Get the status of a background recommendation run"""
+    run = await run_manager.get_status(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return run
+
+@app.get("/runs/{run_id}/result", response_model=JobRecommendationResponse)
+async def get_run_result(run_id: str):
+    """Get the result of a completed background recommendation run"""
+    run = await run_manager.get_status(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    if run.status == "failed":
+        raise HTTPException(status_code=500, detail=f"Run failed: {run.error}")
+    if run.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Run is {run.status}")
+    return await run_manager.get_result(run_id)
+
 @app.get("/health")
 async def health_check():
     """Detailed health check with API key status"""
@@ -75,112 +214,147 @@ async def health_check():
         "firecrawl_configured": bool(os.getenv("FIRECRAWL_API_KEY"))
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: per-stage latency histograms, upstream errors, in-flight requests and cache ratios"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # With several uvicorn workers, aggregate every worker's samples rather than reporting whichever one answered
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        # Cache and fast-path counters live in process memory, so these come from the worker that answered
+        registry.register(ServiceStatsCollector(job_service))
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/stats")
+async def stats():
+    """Cache and fast-path counters for the scraping pipeline"""
+    return {
+        "scrape_cache": job_service.scrape_cache.stats(),
+        "link_extraction": job_service.link_extraction_stats(),
+        "single_flight": {
+            "scrape": job_service.scrape_flights.stats(),
+            "link_extraction": job_service.link_extraction_flights.stats()
+        },
+        "job_store": job_service.job_store.stats() if job_service.job_store else None,
+        "upstreams": job_service.upstream_stats(),
+        "startup": startup_report.as_dict(),
+        "runs": run_manager.stats()
+    }
+
+# Mock postings for the demo endpoint
+DEMO_JOB_DATA = [
+    {
+        "job_title": "Data Engineering Manager",
+        "location": "San Francisco",
+        "compensation": "$405K – $490K • Offers Equity",
+        "key_skills": [
+            "data engineering",
+            "leadership",
+            "data strategy",
+            "data architecture",
+            "data quality",
+            "data governance",
+            "programming languages (Python, Scala, Java)"
+        ],
+        "apply_link": "https://jobs.ashbyhq.com/openai/b3394315-e8da-4f54-9926-dfe32a1e4913/application",
+        "sub_division_of_organization": "Applied AI"
+    },
+    {
+        "job_title": "Data Engineer, Analytics",
+        "location": "San Francisco",
+        "compensation": "$255K – $405K • Offers Equity",
+        "key_skills": [
+            "3+ years of experience as a data engineer",
+            "8+ years of software engineering experience",
+            "Proficiency in Python, Scala, or Java",
+            "Experience with Hadoop, Flink, HDFS, S3",
+            "Expertise with ETL schedulers like Airflow, Dagster, Prefect",
+            "Solid understanding of Spark"
+        ],
+        "apply_link": "https://jobs.ashbyhq.com/openai/fc5bbc77-a30c-4e7a-9acc-8a2e748545b4/application",
+        "sub_division_of_organization": "Applied AI"
+    },
+    {
+        "job_title": "Backend Software Engineer (Evals)",
+        "location": "San Francisco",
+        "compensation": "$255K – $405K • Offers Equity",
+        "key_skills": [
+            "Backend engineering",
+            "Python",
+            "FastAPI",
+            "Postgres",
+            "Distributed systems",
+            "APIs",
+            "Data processing pipelines",
+            "AI agents",
+            "Evaluation methods for LLMs"
+        ],
+        "apply_link": "https://jobs.ashbyhq.com/openai/3d064454-c0c3-4225-bc2c-6d8c0f8735b2/application",
+        "sub_division_of_organization": "Applied AI"
+    },
+    {
+        "job_title": "Backend Software Engineer, Growth",
+        "location": "San Francisco",
+        "compensation": "$160K – $385K • Offers Equity",
+        "key_skills": [
+            "data analysis",
+            "product ideation",
+            "experimentation",
+            "A/B testing",
+            "backend systems",
+            "collaboration with cross-functional teams"
+        ],
+        "apply_link": "https://jobs.ashbyhq.com/openai/dd2025b9-4d18-4ad7-a78c-7a643419ecc5/application",
+        "sub_division_of_organization": "Applied AI"
+    },
+    {
+        "job_title": "Engineering Manager, Data Infrastructure",
+        "location": "San Francisco",
+        "compensation": "$325K – $405K • Offers Equity",
+        "key_skills": [
+            "Data Infrastructure",
+            "Terraform",
+            "Kubernetes",
+            "SRE",
+            "Apache Spark",
+            "Apache Iceberg",
+            "Airflow",
+            "Kafka",
+            "Flink",
+            "Chronon"
+        ],
+        "apply_link": "https://jobs.ashbyhq.com/openai/4f5a0df1-22d7-49a6-8ea1-c15c886fbade/application",
+        "sub_division_of_organization": "Applied AI"
+    }
+]
+
+# Validated once at import rather than on every demo request
+DEMO_JOBS = [JobData(**job) for job in DEMO_JOB_DATA]
+
 @app.post("/recommend-jobs-demo", response_model=JobRecommendationResponse)
 async def recommend_jobs_demo(request: JobRecommendationRequest):
     """
     Demo endpoint that uses mock job data for testing purposes
     """
+    start_time = time.time()
     try:
         # Validate OpenAI API key for demo
         if not os.getenv("OPENAI_API_KEY"):
             raise HTTPException(status_code=500, detail="OpenAI API key not configured")
         
-        # Use mock job data
-        mock_job_data = [
-            {
-                "job_title": "Data Engineering Manager",
-                "location": "San Francisco",
-                "compensation": "$405K – $490K • Offers Equity",
-                "key_skills": [
-                    "data engineering",
-                    "leadership",
-                    "data strategy",
-                    "data architecture",
-                    "data quality",
-                    "data governance",
-                    "programming languages (Python, Scala, Java)"
-                ],
-                "apply_link": "https://jobs.ashbyhq.com/openai/b3394315-e8da-4f54-9926-dfe32a1e4913/application",
-                "sub_division_of_organization": "Applied AI"
-            },
-            {
-                "job_title": "Data Engineer, Analytics",
-                "location": "San Francisco",
-                "compensation": "$255K – $405K • Offers Equity",
-                "key_skills": [
-                    "3+ years of experience as a data engineer",
-                    "8+ years of software engineering experience",
-                    "Proficiency in Python, Scala, or Java",
-                    "Experience with Hadoop, Flink, HDFS, S3",
-                    "Expertise with ETL schedulers like Airflow, Dagster, Prefect",
-                    "Solid understanding of Spark"
-                ],
-                "apply_link": "https://jobs.ashbyhq.com/openai/fc5bbc77-a30c-4e7a-9acc-8a2e748545b4/application",
-                "sub_division_of_organization": "Applied AI"
-            },
-            {
-                "job_title": "Backend Software Engineer (Evals)",
-                "location": "San Francisco",
-                "compensation": "$255K – $405K • Offers Equity",
-                "key_skills": [
-                    "Backend engineering",
-                    "Python",
-                    "FastAPI",
-                    "Postgres",
-                    "Distributed systems",
-                    "APIs",
-                    "Data processing pipelines",
-                    "AI agents",
-                    "Evaluation methods for LLMs"
-                ],
-                "apply_link": "https://jobs.ashbyhq.com/openai/3d064454-c0c3-4225-bc2c-6d8c0f8735b2/application",
-                "sub_division_of_organization": "Applied AI"
-            },
-            {
-                "job_title": "Backend Software Engineer, Growth",
-                "location": "San Francisco",
-                "compensation": "$160K – $385K • Offers Equity",
-                "key_skills": [
-                    "data analysis",
-                    "product ideation",
-                    "experimentation",
-                    "A/B testing",
-                    "backend systems",
-                    "collaboration with cross-functional teams"
-                ],
-                "apply_link": "https://jobs.ashbyhq.com/openai/dd2025b9-4d18-4ad7-a78c-7a643419ecc5/application",
-                "sub_division_of_organization": "Applied AI"
-            },
-            {
-                "job_title": "Engineering Manager, Data Infrastructure",
-                "location": "San Francisco",
-                "compensation": "$325K – $405K • Offers Equity",
-                "key_skills": [
-                    "Data Infrastructure",
-                    "Terraform",
-                    "Kubernetes",
-                    "SRE",
-                    "Apache Spark",
-                    "Apache Iceberg",
-                    "Airflow",
-                    "Kafka",
-                    "Flink",
-                    "Chronon"
-                ],
-                "apply_link": "https://jobs.ashbyhq.com/openai/4f5a0df1-22d7-49a6-8ea1-c15c886fbade/application",
-                "sub_division_of_organization": "Applied AI"
-            }
-        ]
         
         # Limit to requested number of jobs
-        limited_jobs = mock_job_data[:request.num_jobs]
+        limited_jobs = DEMO_JOBS[:request.num_jobs]
         
         # Generate recommendations using AI
-        result = await job_service._generate_recommendations(
-            resume_text=request.resume_text,
-            job_data=[JobData(**job) for job in limited_jobs],
-            num_recommendations=request.num_recommendations
-        )
+        with track_usage() as usage:
+            result = await job_service._generate_recommendations(
+                resume_text=request.resume_text,
+                job_data=limited_jobs,
+                num_recommendations=request.num_recommendations,
+                shortlist_size=request.shortlist_size
+            )
         
         return JobRecommendationResponse(
             success=True,
@@ -188,12 +362,14 @@ async def recommend_jobs_demo(request: JobRecommendationRequest):
             total_jobs_found=len(limited_jobs),
             total_jobs_analyzed=len(limited_jobs),
             recommendations=result,
-            all_jobs=[JobData(**job) for job in limited_jobs],
-            processing_time_seconds=1.5
+            **job_fields(limited_jobs, request.include_jobs),
+            processing_time_seconds=round(time.time() - start_time, 2),
+            token_usage=usage
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing demo request: {str(e)}")
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
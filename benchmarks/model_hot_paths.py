@@ -0,0 +1,158 @@
+"""
+Time the request/response model hot paths at 20, 200 and 2000 jobs: JobData validation,
+JobRecommendationResponse rendering through FastAPI, and ranking prompt building
+
+Usage:
+    python benchmarks/model_hot_paths.py
+    python benchmarks/model_hot_paths.py --jobs 20 200 2000 --rounds 50
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import warnings
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+from job_encoding import build_ranking_prompt
+from models import JobData, JobRecommendation, JobRecommendationResponse
+from prompt_encoding import RESUME, make_jobs
+
+try:
+    import orjson  # noqa: F401  (ORJSONResponse needs it)
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# FastAPI deprecates ORJSONResponse for response_model routes; it is only here to show why
+warnings.filterwarnings("ignore", message="ORJSONResponse is deprecated")
+
+
+def per_call_ms(fn: Callable[[], object], rounds: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def make_response(jobs: List[JobData]) -> JobRecommendationResponse:
+    return JobRecommendationResponse(
+        success=True,
+        message="benchmark",
+        total_jobs_found=len(jobs),
+        total_jobs_analyzed=len(jobs),
+        recommendations=[
+            JobRecommendation(job_title=job.job_title, compensation=job.compensation, apply_link=job.apply_link, match_reason="fit")
+            for job in jobs[:3]
+        ],
+        all_jobs=jobs,
+        processing_time_seconds=1.0
+    )
+
+
+RENDER_PATHS = ["/default", "/json-response"] + (["/orjson-response"] if HAS_ORJSON else [])
+
+
+def render_app(response: JobRecommendationResponse) -> FastAPI:
+    """
+    One route per rendering strategy, all returning the same response. With no response_class,
+    FastAPI dumps the response_model straight to JSON bytes in pydantic's Rust core; naming any
+    response class, even a faster encoder, opts out of that and goes through a Python dict first.
+    """
+    app = FastAPI()
+
+    @app.get("/default", response_model=JobRecommendationResponse)
+    async def default():
+        return response
+
+    @app.get("/json-response", response_model=JobRecommendationResponse, response_class=JSONResponse)
+    async def json_response():
+        return response
+
+    if HAS_ORJSON:
+        @app.get("/orjson-response", response_model=JobRecommendationResponse, response_class=ORJSONResponse)
+        async def orjson_response():
+            return response
+
+    return app
+
+
+async def request_ms(client: httpx.AsyncClient, path: str, rounds: int) -> float:
+    await client.get(path)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        (await client.get(path)).raise_for_status()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+async def render_timings(response: JobRecommendationResponse, rounds: int) -> List[float]:
+    transport = httpx.ASGITransport(app=render_app(response))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        return [await request_ms(client, path, rounds) for path in RENDER_PATHS]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, nargs="+", default=[20, 200, 2000])
+    parser.add_argument("--rounds", type=int, default=30)
+    args = parser.parse_args()
+    jobs_adapter = TypeAdapter(List[JobData])
+
+    print("JobData construction, ms per list")
+    print(f"{'jobs':>5} {'JobData(**d)':>13} {'validate':>9} {'adapter':>9} {'construct':>10}")
+    for count in args.jobs:
+        raw = [job.model_dump() for job in make_jobs(count)]
+        print(
+            f"{count:>5} "
+            f"{per_call_ms(lambda: [JobData(**d) for d in raw], args.rounds):>13.2f} "
+            f"{per_call_ms(lambda: [JobData.model_validate(d) for d in raw], args.rounds):>9.2f} "
+            f"{per_call_ms(lambda: jobs_adapter.validate_python(raw), args.rounds):>9.2f} "
+            f"{per_call_ms(lambda: [JobData.model_construct(**d) for d in raw], args.rounds):>10.2f}"
+        )
+
+    print("\nJobRecommendationResponse to and from JSON bytes, ms per response")
+    print(f"{'jobs':>5} {'bytes':>8} {'encoder+dumps':>14} {'dump+dumps':>11} {'dump_json':>10} {'loads+init':>11} {'validate_json':>14}")
+    for count in args.jobs:
+        response = make_response(make_jobs(count))
+        body = response.model_dump_json()
+        print(
+            f"{count:>5} {len(body):>8} "
+            f"{per_call_ms(lambda: json.dumps(jsonable_encoder(response)).encode(), args.rounds):>14.2f} "
+            f"{per_call_ms(lambda: json.dumps(response.model_dump(mode='json')).encode(), args.rounds):>11.2f} "
+            f"{per_call_ms(lambda: response.model_dump_json().encode(), args.rounds):>10.2f} "
+            f"{per_call_ms(lambda: JobRecommendationResponse(**json.loads(body)), args.rounds):>11.2f} "
+            f"{per_call_ms(lambda: JobRecommendationResponse.model_validate_json(body), args.rounds):>14.2f}"
+        )
+
+    print("\nFastAPI route returning the response, ms per request (in-process ASGI)")
+    print(f"{'jobs':>5} {'default':>8} {'JSONResponse':>13}" + (f" {'ORJSONResponse':>15}" if HAS_ORJSON else ""))
+    for count in args.jobs:
+        response = make_response(make_jobs(count))
+        timings = asyncio.run(render_timings(response, args.rounds))
+        widths = [8, 13, 15]
+        print(f"{count:>5} " + " ".join(f"{ms:>{width}.2f}" for ms, width in zip(timings, widths)))
+
+    print("\nRanking prompt building, ms per prompt")
+    print(f"{'jobs':>5} {'compact':>8} {'json':>8}")
+    for count in args.jobs:
+        jobs = make_jobs(count)
+        print(
+            f"{count:>5} "
+            f"{per_call_ms(lambda: build_ranking_prompt(RESUME, jobs, 3, 'compact'), args.rounds):>8.2f} "
+            f"{per_call_ms(lambda: build_ranking_prompt(RESUME, jobs, 3, 'json'), args.rounds):>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Compare the ranking prompt's size and latency in the compact and JSON job encodings
+
+Usage:
+    python benchmarks/prompt_encoding.py                  # token counts and encode time only
+    python benchmarks/prompt_encoding.py --live --repeat 3  # also time real gpt-4o-mini calls
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import statistics
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_encoding import PROMPT_ENCODINGS, build_ranking_prompt, recommendations_from_response
+from models import JobData
+from token_utils import estimate_tokens, tokenizer_name
+
+TITLES = ["Software Engineer", "Data Engineer", "Research Scientist", "Product Manager", "Solutions Architect",
+          "Security Engineer", "Data Scientist", "Engineering Manager", "Technical Program Manager", "Designer"]
+TEAMS = ["Applied AI", "Infrastructure", "Research", "Go To Market", "Safety Systems", "Platform", None]
+LOCATIONS = ["San Francisco", "New York City", "London", "Remote - US", "Dublin", "Tokyo"]
+SKILLS = ["Python", "SQL", "Spark", "Kubernetes", "Distributed systems", "Machine learning", "PyTorch",
+          "Data modeling", "Stakeholder management", "Go", "Rust", "TypeScript", "React", "AWS", "Terraform",
+          "Statistics", "Experimentation", "Leadership", "Communication", "Security"]
+
+RESUME = """Senior data engineer with 8 years building batch and streaming pipelines in Python, SQL and Spark.
+Led a platform team migrating warehouse workloads to Kubernetes on AWS; designed data models and
+experimentation tooling used across product analytics. Mentors engineers and partners with stakeholders."""
+
+
+def make_jobs(count: int, seed: int = 7) -> List[JobData]:
+    rng = random.Random(seed)
+    jobs = []
+    for index in range(count):
+        low = rng.randrange(150, 350, 5)
+        jobs.append(JobData(
+            job_title=f"{rng.choice(TITLES)}, {rng.choice(['Core', 'Growth', 'Enterprise', 'API'])}",
+            location=rng.choice(LOCATIONS),
+            compensation=f"${low}K – ${low + rng.randrange(40, 120, 5)}K • Offers Equity",
+            key_skills=rng.sample(SKILLS, rng.randint(4, 8)),
+            apply_link=f"https://jobs.ashbyhq.com/example/{rng.getrandbits(128):032x}/application",
+            sub_division_of_organization=rng.choice(TEAMS)
+        ))
+    return jobs
+
+
+def encode_seconds(jobs: List[JobData], encoding: str, rounds: int = 200) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        build_ranking_prompt(RESUME, jobs, 3, encoding)
+    return (time.perf_counter() - start) / rounds
+
+
+async def live_call(client, prompt: str, jobs: List[JobData], encoding: str) -> Dict[str, float]:
+    start = time.perf_counter()
+    completion = await client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[{"role": "user", "content": prompt}]
+    )
+    elapsed = time.perf_counter() - start
+
+    content = completion.choices[0].message.content.strip().removeprefix("```json").strip("`").strip()
+    try:
+        picks = len(recommendations_from_response(json.loads(content), jobs, encoding))
+    except Exception:
+        picks = 0
+    return {
+        "seconds": elapsed,
+        "prompt_tokens": completion.usage.prompt_tokens,
+        "completion_tokens": completion.usage.completion_tokens,
+        "picks": picks
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--jobs", type=int, nargs="+", default=[20, 100])
+    parser.add_argument("--live", action="store_true", help="Call OpenAI with each prompt (needs OPENAI_API_KEY)")
+    parser.add_argument("--repeat", type=int, default=3, help="Live calls per encoding and size")
+    args = parser.parse_args()
+
+    print(f"Token counts via {tokenizer_name() or 'length/4 estimate'}")
+    print(f"{'jobs':>5} {'encoding':>8} {'chars':>8} {'tokens':>7} {'encode_ms':>9}")
+    for count in args.jobs:
+        jobs = make_jobs(count)
+        baseline = None
+        for encoding in ("json", "compact"):
+            prompt = build_ranking_prompt(RESUME, jobs, 3, encoding)
+            tokens = estimate_tokens(prompt)
+            baseline = baseline or tokens
+            saving = f"  ({1 - tokens / baseline:.0%} fewer tokens)" if encoding != "json" else ""
+            print(f"{count:>5} {encoding:>8} {len(prompt):>8} {tokens:>7} {encode_seconds(jobs, encoding) * 1000:>9.2f}{saving}")
+
+    if not args.live:
+        return
+
+    from openai import AsyncOpenAI
+    client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    print(f"\n{'jobs':>5} {'encoding':>8} {'p50_s':>7} {'prompt_tok':>10} {'compl_tok':>9} {'picks':>5}")
+    for count in args.jobs:
+        jobs = make_jobs(count)
+        for encoding in PROMPT_ENCODINGS:
+            prompt = build_ranking_prompt(RESUME, jobs, 3, encoding)
+            runs = [await live_call(client, prompt, jobs, encoding) for _ in range(args.repeat)]
+            print(
+                f"{count:>5} {encoding:>8} {statistics.median(r['seconds'] for r in runs):>7.2f} "
+                f"{runs[0]['prompt_tokens']:>10} {statistics.median(r['completion_tokens'] for r in runs):>9.0f} "
+                f"{min(r['picks'] for r in runs):>5}"
+            )
+    await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,256 @@
+"""
+Two-tier TTL cache for Firecrawl scrape responses
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class ScrapeCache:
+    """
+    LRU in-memory cache backed by an optional SQLite tier that survives restarts and is
+    shared by every worker process pointing at the same directory
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 3600,
+        max_entries: int = 512,
+        disk_dir: Optional[str] = None,
+        max_disk_entries: int = 5000
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._disk_entries = 0
+        self.counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "lease_waits": 0,
+            "lease_hits": 0
+        }
+
+        # Identifies this process's leases in the shared disk tier
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._open_disk()
+            self._disk_entries = self._count_disk()
+
+    @classmethod
+    def from_env(cls) -> "ScrapeCache":
+        """Build a cache from SCRAPE_CACHE_* environment variables"""
+        return cls(
+            ttl_seconds=float(os.getenv("SCRAPE_CACHE_TTL_SECONDS", "3600")),
+            max_entries=int(os.getenv("SCRAPE_CACHE_MAX_ENTRIES", "512")),
+            disk_dir=os.getenv("SCRAPE_CACHE_DIR", "data/scrape_cache") or None,
+            max_disk_entries=int(os.getenv("SCRAPE_CACHE_MAX_DISK_ENTRIES", "5000"))
+        )
+
+    @staticmethod
+    def make_key(payload: Dict[str, Any]) -> str:
+        """Build a cache key from the URL and every scrape option in the payload"""
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached value, checking memory first and then disk"""
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.time():
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return value
+            del self._memory[key]
+            self.counters["expirations"] += 1
+
+        if self.disk_dir:
+            entry = await asyncio.to_thread(self._read_disk, key)
+            if entry is not None:
+                self._set_memory(key, entry[0], entry[1])
+                self.counters["disk_hits"] += 1
+                return entry[1]
+
+        self.counters["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: Dict[str, Any], ttl_seconds: Optional[float] = None):
+        """Store a value in both tiers"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0:
+            return
+
+        expires_at = time.time() + ttl
+        self._set_memory(key, expires_at, value)
+        self.counters["sets"] += 1
+
+        if self.disk_dir:
+            await asyncio.to_thread(self._write_disk, key, expires_at, value)
+
+    async def acquire_lease(self, key: str, seconds: float) -> bool:
+        """
+        Claim the right to fill `key` for up to `seconds`, so other worker processes sharing
+        the disk tier wait for this one instead of scraping the same page; always True without a disk tier
+        """
+        if not self.disk_dir:
+            return True
+        return await asyncio.to_thread(self._acquire_lease, key, seconds)
+
+    async def release_lease(self, key: str):
+        if self.disk_dir:
+            await asyncio.to_thread(self._release_lease, key)
+
+    async def wait_for(self, key: str, timeout: float, poll_seconds: float = 0.25) -> Optional[Dict[str, Any]]:
+        """Wait for another process holding the lease on `key` to fill it; None if the lease ends without a value"""
+        self.counters["lease_waits"] += 1
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            await asyncio.sleep(poll_seconds)
+            entry = await asyncio.to_thread(self._read_disk, key)
+            if entry is not None:
+                self._set_memory(key, entry[0], entry[1])
+                self.counters["lease_hits"] += 1
+                return entry[1]
+            if not await asyncio.to_thread(self._lease_held, key):
+                return None
+        return None
+
+    def close(self):
+        if self.disk_dir:
+            with self._lock:
+                self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current tier sizes"""
+        hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+        lookups = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": self._disk_entries
+        }
+
+    def _set_memory(self, key: str, expires_at: float, value: Dict[str, Any]):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def _open_disk(self):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(self.disk_dir, "scrape_cache.db"), check_same_thread=False, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS leases (
+                key TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def _count_disk(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def _read_disk(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                self.counters["expirations"] += 1
+                return None
+            # Track access so disk pruning evicts least recently used entries first
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return row[1], json.loads(row[0])
+
+    def _write_disk(self, key: str, expires_at: float, value: Dict[str, Any]):
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), expires_at, time.time())
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error writing scrape cache entry: {str(e)}")
+            return
+
+        self._disk_entries = self._count_disk()
+        if self._disk_entries > self.max_disk_entries:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """Drop expired entries, then the least recently used down to 90% of the bound"""
+        target = int(self.max_disk_entries * 0.9)
+        with self._lock:
+            expired = self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),)).rowcount
+            total = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            evicted = 0
+            if total > target:
+                evicted = self._conn.execute(
+                    "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed_at LIMIT ?)",
+                    (total - target,)
+                ).rowcount
+            self._conn.commit()
+        self.counters["expirations"] += expired
+        self.counters["evictions"] += evicted
+        self._disk_entries = total - evicted
+
+    def _acquire_lease(self, key: str, seconds: float) -> bool:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE key = ? AND expires_at <= ?", (key, now))
+            acquired = self._conn.execute(
+                "INSERT OR IGNORE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, self._owner, now + seconds)
+            ).rowcount == 1
+            self._conn.commit()
+        return acquired
+
+    def _release_lease(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, self._owner))
+            self._conn.commit()
+
+    def _lease_held(self, key: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM leases WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row is not None
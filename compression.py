@@ -0,0 +1,146 @@
+"""
+Negotiated gzip/brotli compression for buffered responses; streamed bodies are passed through untouched
+"""
+
+import os
+import gzip
+import asyncio
+import importlib.util
+from typing import List, Optional, Tuple
+
+from prometheus_client import Counter
+from starlette.datastructures import Headers, MutableHeaders
+
+# Brotli needs the optional brotli package; gzip is always available
+BROTLI_AVAILABLE = importlib.util.find_spec("brotli") is not None
+
+# Compressing these would hold back events until a whole buffer fills
+STREAMING_CONTENT_TYPES = ("text/event-stream", "application/x-ndjson")
+
+# Bodies above this are compressed in a worker thread so the event loop keeps serving
+THREAD_MINIMUM_BYTES = 128 * 1024
+
+COMPRESSION_BYTES = Counter(
+    "http_compression_bytes_total",
+    "Response body bytes before (raw) and after (compressed) compression, by encoding",
+    ["encoding", "stage"]
+)
+
+
+def negotiate_encoding(accept_encoding: str, brotli_available: bool = BROTLI_AVAILABLE) -> Optional[str]:
+    """Pick 'br' or 'gzip' from an Accept-Encoding header by q-value, preferring br on ties"""
+    offered: List[Tuple[float, int, str]] = []
+    wildcard: Optional[float] = None
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        if coding == "*":
+            wildcard = quality
+        elif coding in ("br", "gzip"):
+            offered.append((quality, coding == "br", coding))
+
+    named = {coding for _, _, coding in offered}
+    if wildcard is not None:
+        offered.extend((wildcard, coding == "br", coding) for coding in ("br", "gzip") if coding not in named)
+
+    candidates = [item for item in offered if item[0] > 0 and (item[2] != "br" or brotli_available)]
+    return max(candidates)[2] if candidates else None
+
+
+def compress(body: bytes, encoding: str, gzip_level: int, brotli_quality: int) -> bytes:
+    if encoding == "br":
+        import brotli
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses sent in a single body message (regular JSON responses)
+    with the best encoding the client accepts. Responses sent in several messages, such as the
+    NDJSON/SSE recommendation stream, and streaming content types are left alone so events still
+    reach the client as soon as they are produced.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    @classmethod
+    def options_from_env(cls) -> dict:
+        """Keyword arguments for app.add_middleware from COMPRESSION_* environment variables"""
+        return {
+            "minimum_size": int(os.getenv("COMPRESSION_MIN_BYTES", "1024")),
+            "gzip_level": int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+            "brotli_quality": int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.minimum_size <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[dict] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if "content-encoding" in headers or content_type.startswith(STREAMING_CONTENT_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Hold the headers back until we know whether the body is worth compressing
+                    start_message = message
+                return
+
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                # Streamed or tiny: send as is, and everything after it too
+                passthrough = True
+                headers = MutableHeaders(raw=start_message["headers"])
+                if not message.get("more_body", False):
+                    headers.add_vary_header("Accept-Encoding")
+                await send(start_message)
+                await send(message)
+                return
+
+            if len(body) >= THREAD_MINIMUM_BYTES:
+                compressed = await asyncio.to_thread(compress, body, encoding, self.gzip_level, self.brotli_quality)
+            else:
+                compressed = compress(body, encoding, self.gzip_level, self.brotli_quality)
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            COMPRESSION_BYTES.labels(encoding=encoding, stage="raw").inc(len(body))
+            COMPRESSION_BYTES.labels(encoding=encoding, stage="compressed").inc(len(compressed))
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,120 @@
+"""
+Encodings of job listings for the ranking prompt, and mapping the model's picks back to jobs
+"""
+
+import json
+from typing import Any, Dict, List
+
+from models import JobData, JobRecommendation
+
+PROMPT_ENCODINGS = ("compact", "json")
+
+# Column order of the compact encoding; skills are indexes into a shared vocabulary
+COMPACT_COLUMNS = "id|title|location|compensation|division|skills"
+
+
+def _cell(value: str) -> str:
+    """Make a value safe for a single pipe-delimited line"""
+    return " ".join((value or "").replace("|", "/").split())
+
+
+def encode_jobs_json(jobs: List[JobData]) -> str:
+    """The original indented JSON listing"""
+    return json.dumps([job.model_dump() for job in jobs], indent=2)
+
+
+def encode_jobs_compact(jobs: List[JobData]) -> str:
+    """
+    One line per job keyed by its position, with skills deduplicated into a numbered vocabulary;
+    the model answers with ids instead of repeating apply links
+    """
+    vocabulary: Dict[str, int] = {}
+    skills: List[str] = []
+    rows = []
+    for index, job in enumerate(jobs):
+        skill_ids = []
+        for skill in job.key_skills:
+            name = _cell(skill)
+            key = name.lower()
+            if not key:
+                continue
+            if key not in vocabulary:
+                vocabulary[key] = len(skills)
+                skills.append(name)
+            if vocabulary[key] not in skill_ids:
+                skill_ids.append(vocabulary[key])
+        rows.append("|".join([
+            str(index),
+            _cell(job.job_title),
+            _cell(job.location),
+            _cell(job.compensation),
+            _cell(job.sub_division_of_organization or ""),
+            ",".join(str(skill_id) for skill_id in skill_ids)
+        ]))
+
+    skill_line = "; ".join(f"{skill_id}={name}" for skill_id, name in enumerate(skills))
+    return f"Skills: {skill_line}\n{COMPACT_COLUMNS}\n" + "\n".join(rows)
+
+
+def build_ranking_prompt(resume_text: str, jobs: List[JobData], num_recommendations: int, encoding: str = "compact") -> str:
+    """Build the ranking prompt for a resume and a set of jobs in the given encoding"""
+    if encoding == "json":
+        return f"""
+        Please analyze the resume and job listings, and return a JSON list of the top {num_recommendations} roles that best fit the candidate's experience and skills.
+        Include only the job title, compensation, and apply link for each recommended role.
+        The output should be a valid JSON array of objects in the following format, with no additional text:
+
+        [
+          {{
+            "job_title": "Job Title",
+            "compensation": "Compensation (if available, otherwise empty string)",
+            "apply_link": "Application URL",
+            "match_reason": "Brief explanation of why this job matches the candidate's background"
+          }},
+          ...
+        ]
+
+        Based on the following resume:
+        {resume_text}
+
+        And the following job listings:
+        {encode_jobs_json(jobs)}
+        """
+
+    return f"""Analyze the resume and job listings, and return the top {num_recommendations} roles that best fit the candidate's experience and skills, best first.
+Jobs are listed one per line as {COMPACT_COLUMNS}; skills are numbers from the Skills list.
+Return only a valid JSON array, with no additional text, in this format:
+[{{"id": 0, "match_reason": "Brief explanation of why this job matches the candidate's background"}}]
+
+Resume:
+{resume_text}
+
+Job listings:
+{encode_jobs_compact(jobs)}
+"""
+
+
+def recommendations_from_response(data: Any, jobs: List[JobData], encoding: str = "compact") -> List[JobRecommendation]:
+    """Turn the parsed model output into recommendations, resolving compact ids against the encoded jobs"""
+    if encoding == "json":
+        return [JobRecommendation(**rec) for rec in data]
+
+    recommendations = []
+    seen = set()
+    for rec in data:
+        try:
+            index = int(rec["id"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        # Ignore hallucinated or repeated ids
+        if index in seen or not 0 <= index < len(jobs):
+            continue
+        seen.add(index)
+        job = jobs[index]
+        recommendations.append(JobRecommendation(
+            job_title=job.job_title,
+            compensation=job.compensation,
+            apply_link=job.apply_link,
+            match_reason=rec.get("match_reason")
+        ))
+    return recommendations
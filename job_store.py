@@ -0,0 +1,177 @@
+"""
+Durable local store of extracted job postings, keyed by normalized apply link
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from models import JobData
+from link_extractors import find_urls
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = ("utm_", "gh_src", "lever-source", "lever-origin", "source", "ref")
+
+
+def normalize_link(link: str) -> str:
+    """Canonical form of a posting URL so trivially different links share one record"""
+    parts = urlsplit(link.strip())
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ""))
+
+
+def board_fingerprint(markdown: str, base_url: Optional[str] = None) -> str:
+    """Content hash of the normalized set of links on a board page"""
+    links = sorted({normalize_link(url) for url in find_urls(markdown, base_url)})
+    return hashlib.sha256("\n".join(links).encode("utf-8")).hexdigest()
+
+
+class JobStore:
+    """SQLite-backed job corpus that lets repeat requests skip scraping postings it already has"""
+
+    def __init__(self, path: str, ttl_seconds: float = 86400):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.counters = {"reused": 0, "stored": 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                link_key TEXT PRIMARY KEY,
+                apply_link TEXT NOT NULL,
+                data TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                scraped_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS boards (
+                board_key TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                job_links TEXT NOT NULL,
+                num_jobs INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls) -> Optional["JobStore"]:
+        """Build a store from JOB_STORE_* environment variables; None if disabled"""
+        path = os.getenv("JOB_STORE_PATH", "data/jobs.db")
+        if not path:
+            return None
+        return cls(path, ttl_seconds=float(os.getenv("JOB_STORE_TTL_SECONDS", "86400")))
+
+    async def get_fresh(self, links: List[str], ignore_ttl: bool = False) -> Dict[str, JobData]:
+        """Return stored jobs scraped within the TTL (or any age), keyed by the given link, and mark all links as seen"""
+        return await asyncio.to_thread(self._get_fresh, links, ignore_ttl)
+
+    async def get_board(self, board_url: str) -> Optional[Dict[str, Any]]:
+        """Return the fingerprint and job links recorded for a board's last run"""
+        return await asyncio.to_thread(self._get_board, board_url)
+
+    async def save_board(self, board_url: str, fingerprint: str, job_links: List[str], num_jobs: int):
+        """Record a board's fingerprint and the job links extracted from it"""
+        await asyncio.to_thread(self._save_board, board_url, fingerprint, job_links, num_jobs)
+
+    async def upsert(self, link: str, job: JobData):
+        """Insert or refresh the record for a freshly scraped posting"""
+        await asyncio.to_thread(self._upsert, link, job)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the corpus size and reuse counters"""
+        with self._lock:
+            total = self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+        return {"jobs": total, **self.counters}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _get_fresh(self, links: List[str], ignore_ttl: bool) -> Dict[str, JobData]:
+        now = time.time()
+        keys = {normalize_link(link): link for link in links}
+        if not keys:
+            return {}
+
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT link_key, data, scraped_at FROM jobs WHERE link_key IN ({placeholders})",
+                list(keys)
+            ).fetchall()
+            self._conn.execute(
+                f"UPDATE jobs SET last_seen = ? WHERE link_key IN ({placeholders})",
+                [now, *keys]
+            )
+            self._conn.commit()
+
+        fresh = {}
+        for link_key, data, scraped_at in rows:
+            if ignore_ttl or scraped_at + self.ttl_seconds > now:
+                fresh[keys[link_key]] = JobData.model_validate_json(data)
+        self.counters["reused"] += len(fresh)
+        return fresh
+
+    def _upsert(self, link: str, job: JobData):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO jobs (link_key, apply_link, data, first_seen, last_seen, scraped_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(link_key) DO UPDATE SET
+                    apply_link = excluded.apply_link,
+                    data = excluded.data,
+                    last_seen = excluded.last_seen,
+                    scraped_at = excluded.scraped_at
+                """,
+                (normalize_link(link), link, job.model_dump_json(), now, now, now)
+            )
+            self._conn.commit()
+        self.counters["stored"] += 1
+
+    def _get_board(self, board_url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, job_links, num_jobs FROM boards WHERE board_key = ?",
+                (normalize_link(board_url),)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"fingerprint": row[0], "job_links": json.loads(row[1]), "num_jobs": row[2]}
+
+    def _save_board(self, board_url: str, fingerprint: str, job_links: List[str], num_jobs: int):
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO boards (board_key, fingerprint, job_links, num_jobs, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(board_key) DO UPDATE SET
+                    fingerprint = excluded.fingerprint,
+                    job_links = excluded.job_links,
+                    num_jobs = excluded.num_jobs,
+                    updated_at = excluded.updated_at
+                """,
+                (normalize_link(board_url), fingerprint, json.dumps(job_links), num_jobs, time.time())
+            )
+            self._conn.commit()
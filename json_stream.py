@@ -0,0 +1,81 @@
+"""
+Incremental parsing of a JSON array of objects as it streams in from the model
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+
+class JsonArrayStream:
+    """
+    Feed text chunks of a top-level JSON array and get back each object as soon as it closes.
+    Anything before the opening bracket (a markdown fence, stray prose) is ignored.
+    """
+
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._started = False
+        self._finished = False
+        self._object_start: Optional[int] = None
+        self._position = 0
+        self.errors = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume a chunk and return the objects completed by it, in order"""
+        completed = []
+        for char in chunk:
+            if self._finished:
+                break
+            if not self._started:
+                if char == "[":
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            self._buffer.append(char)
+            self._position += 1
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if self._depth == 1 and char == "{":
+                    self._object_start = self._position - 1
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 1 and char == "}" and self._object_start is not None:
+                    parsed = self._parse("".join(self._buffer[self._object_start:]))
+                    if parsed is not None:
+                        completed.append(parsed)
+                    # Closed objects are never revisited, so drop them from the buffer
+                    self._buffer.clear()
+                    self._position = 0
+                    self._object_start = None
+                elif self._depth == 0:
+                    self._finished = True
+        return completed
+
+    @property
+    def finished(self) -> bool:
+        """Whether the closing bracket of the array has been seen"""
+        return self._finished
+
+    def _parse(self, text: str) -> Optional[Dict[str, Any]]:
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            self.errors += 1
+            return None
+        return value if isinstance(value, dict) else None
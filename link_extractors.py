@@ -0,0 +1,113 @@
+"""
+Rule-based job link extraction for known applicant tracking systems (ATS)
+"""
+
+import re
+from collections import Counter
+from typing import Callable, List, Match, NamedTuple, Optional, Tuple
+from urllib.parse import urljoin
+
+# Markdown link targets and bare URLs
+MARKDOWN_LINK_RE = re.compile(r"\]\(\s*<?([^)\s>]+)>?(?:\s+\"[^\"]*\")?\s*\)")
+BARE_URL_RE = re.compile(r"https?://[^\s)\]>\"'<]+")
+
+UUID = r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+
+
+class ATSPattern(NamedTuple):
+    """URL matcher for one ATS and how to turn a match into the link we scrape"""
+    name: str
+    pattern: "re.Pattern[str]"
+    canonicalize: Callable[[Match], str]
+
+
+ATS_PATTERNS: List[ATSPattern] = [
+    # Ashby postings are scraped on their /application page, which carries the #job-overview tab
+    ATSPattern(
+        "ashby",
+        re.compile(rf"^https?://jobs\.ashbyhq\.com/([^/?#]+)/({UUID})(?:/application)?/?(?:[?#].*)?$", re.I),
+        lambda m: f"https://jobs.ashbyhq.com/{m.group(1)}/{m.group(2).lower()}/application"
+    ),
+    ATSPattern(
+        "greenhouse",
+        re.compile(r"^https?://((?:job-)?boards(?:\.eu)?\.greenhouse\.io)/([^/?#]+)/jobs/(\d+)/?(?:[?#].*)?$", re.I),
+        lambda m: f"https://{m.group(1).lower()}/{m.group(2)}/jobs/{m.group(3)}"
+    ),
+    ATSPattern(
+        "lever",
+        re.compile(rf"^https?://(jobs(?:\.eu)?\.lever\.co)/([^/?#]+)/({UUID})(?:/apply)?/?(?:[?#].*)?$", re.I),
+        lambda m: f"https://{m.group(1).lower()}/{m.group(2)}/{m.group(3).lower()}"
+    ),
+    ATSPattern(
+        "workable",
+        re.compile(r"^https?://apply\.workable\.com/([^/?#]+)/j/([0-9A-F]+)/?(?:apply/?)?(?:[?#].*)?$", re.I),
+        lambda m: f"https://apply.workable.com/{m.group(1)}/j/{m.group(2).upper()}/"
+    ),
+    ATSPattern(
+        "smartrecruiters",
+        re.compile(r"^https?://jobs\.smartrecruiters\.com/([^/?#]+)/(\d{6,}[^/?#]*)/?(?:[?#].*)?$", re.I),
+        lambda m: f"https://jobs.smartrecruiters.com/{m.group(1)}/{m.group(2)}"
+    ),
+    ATSPattern(
+        "recruitee",
+        re.compile(r"^https?://([a-z0-9-]+)\.recruitee\.com/o/([^/?#]+)/?(?:[?#].*)?$", re.I),
+        lambda m: f"https://{m.group(1).lower()}.recruitee.com/o/{m.group(2)}"
+    ),
+    ATSPattern(
+        "workday",
+        re.compile(r"^https?://([a-z0-9-]+\.wd\d+\.myworkdayjobs\.com)/(.+/job/[^?#]+?)/?(?:[?#].*)?$", re.I),
+        lambda m: f"https://{m.group(1).lower()}/{m.group(2)}"
+    ),
+]
+
+
+def find_urls(markdown: str, base_url: Optional[str] = None) -> List[str]:
+    """Return every link target in page order, resolving relative links against base_url"""
+    found = []
+    for match in MARKDOWN_LINK_RE.finditer(markdown):
+        url = match.group(1)
+        if base_url and not url.startswith(("http://", "https://")):
+            if url.startswith(("#", "mailto:", "tel:", "javascript:")):
+                continue
+            url = urljoin(base_url, url)
+        found.append((match.start(1), url))
+    found.extend((match.start(), match.group(0)) for match in BARE_URL_RE.finditer(markdown))
+    found.sort(key=lambda item: item[0])
+    return [url for _, url in found]
+
+
+def match_ats_link(url: str) -> Optional[Tuple[str, str]]:
+    """Return (ats_name, canonical_link) if the URL is a posting on a known ATS"""
+    for ats in ATS_PATTERNS:
+        match = ats.pattern.match(url)
+        if match:
+            return ats.name, ats.canonicalize(match)
+    return None
+
+
+def extract_ats_links(markdown: str, base_url: Optional[str], limit: int) -> Tuple[Optional[str], List[str]]:
+    """
+    Extract up to `limit` job posting links from scraped markdown using known ATS URL layouts.
+
+    Returns the dominant ATS name (None if nothing matched) and the de-duplicated links in page order.
+    """
+    links: List[str] = []
+    seen = set()
+    ats_counts: Counter = Counter()
+
+    for url in find_urls(markdown, base_url):
+        matched = match_ats_link(url)
+        if matched is None:
+            continue
+        ats_name, link = matched
+        if link in seen:
+            continue
+        seen.add(link)
+        links.append(link)
+        ats_counts[ats_name] += 1
+        if len(links) >= limit:
+            break
+
+    if not links:
+        return None, []
+    return ats_counts.most_common(1)[0][0], links
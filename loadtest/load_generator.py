@@ -0,0 +1,169 @@
+"""
+Drive POST /recommend-jobs at a fixed request rate and report throughput, latency percentiles and errors
+
+Usage:
+    python loadtest/load_generator.py --rps 5 --duration 60 --boards 20
+    python loadtest/load_generator.py --url http://localhost:8000 --rps 20 --duration 30 --json
+
+Arrivals are open-loop: requests are sent on schedule whether or not earlier ones have finished,
+so a slow server shows up as rising latency rather than as a quietly lower request rate.
+"""
+
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+RESUME = """Senior data engineer with 8 years building batch and streaming pipelines in Python, SQL and Spark.
+Led a platform team migrating warehouse workloads to Kubernetes on AWS; designed data models and
+experimentation tooling used across product analytics. Mentors engineers and partners with stakeholders."""
+
+
+def percentile(ordered: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(len(ordered) * pct / 100) - 1))]
+
+
+class LoadResult:
+    """Outcome of every request sent during a run"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.outcomes: Counter = Counter()
+        self.skipped = 0
+        self.started = time.perf_counter()
+        self.finished = self.started
+
+    def record(self, outcome: str, seconds: float):
+        self.outcomes[outcome] += 1
+        if outcome == "200":
+            self.latencies.append(seconds)
+
+    def summary(self, target_rps: float) -> Dict[str, Any]:
+        sent = sum(self.outcomes.values())
+        ok = self.outcomes.get("200", 0)
+        elapsed = max(self.finished - self.started, 1e-9)
+        ordered = sorted(self.latencies)
+
+        def rounded(value: Optional[float]) -> Optional[float]:
+            return round(value, 3) if value is not None else None
+
+        return {
+            "target_rps": target_rps,
+            "elapsed_seconds": round(elapsed, 2),
+            "sent": sent,
+            "succeeded": ok,
+            "skipped_at_concurrency_limit": self.skipped,
+            "throughput_rps": round(ok / elapsed, 2),
+            "error_rate": round(1 - ok / sent, 4) if sent else 0.0,
+            "latency_seconds": {
+                "p50": rounded(percentile(ordered, 50)),
+                "p95": rounded(percentile(ordered, 95)),
+                "p99": rounded(percentile(ordered, 99)),
+                "max": rounded(ordered[-1] if ordered else None)
+            },
+            "outcomes": dict(self.outcomes)
+        }
+
+
+async def send(client: httpx.AsyncClient, args, result: LoadResult, semaphore: asyncio.Semaphore):
+    board = random.randrange(args.boards)
+    payload = {
+        "resume_text": RESUME,
+        "jobs_page_url": f"{args.board_url_prefix}-{board}",
+        "num_jobs": args.num_jobs,
+        "num_recommendations": args.num_recommendations
+    }
+    start = time.perf_counter()
+    try:
+        response = await client.post(args.endpoint, json=payload)
+        outcome = str(response.status_code)
+        if response.status_code == 200 and response.headers.get("content-type", "").startswith("application/json"):
+            # The API degrades to an empty answer when ranking fails, which is still an error under load
+            body = response.json()
+            if not body.get("success") or not body.get("recommendations"):
+                outcome = "200_without_recommendations"
+    except httpx.TimeoutException:
+        outcome = "timeout"
+    except httpx.HTTPError as e:
+        outcome = type(e).__name__
+    finally:
+        semaphore.release()
+    result.record(outcome, time.perf_counter() - start)
+
+
+async def run(args) -> LoadResult:
+    result = LoadResult()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        tasks = []
+        interval = 1 / args.rps
+        next_send = time.perf_counter()
+        deadline = next_send + args.duration
+        while next_send < deadline:
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if semaphore.locked():
+                # Past the in-flight cap the server is already saturated; count it rather than queue it
+                result.skipped += 1
+            else:
+                await semaphore.acquire()
+                tasks.append(asyncio.create_task(send(client, args, result, semaphore)))
+            next_send += random.expovariate(args.rps) if args.poisson else interval
+        await asyncio.gather(*tasks)
+    result.finished = time.perf_counter()
+    return result
+
+
+def print_report(summary: Dict[str, Any]):
+    latency = summary["latency_seconds"]
+
+    def fmt(value: Optional[float]) -> str:
+        return f"{value:.3f}s" if value is not None else "n/a"
+
+    print(f"Target rate:   {summary['target_rps']} req/s for {summary['elapsed_seconds']}s")
+    print(f"Sent:          {summary['sent']} ({summary['skipped_at_concurrency_limit']} skipped at the concurrency limit)")
+    print(f"Throughput:    {summary['throughput_rps']} successful req/s")
+    print(f"Error rate:    {summary['error_rate']:.2%}")
+    print(f"Latency:       p50 {fmt(latency['p50'])}  p95 {fmt(latency['p95'])}  p99 {fmt(latency['p99'])}  max {fmt(latency['max'])}")
+    print(f"Outcomes:      {', '.join(f'{key}: {value}' for key, value in sorted(summary['outcomes'].items()))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the API under test")
+    parser.add_argument("--endpoint", default="/recommend-jobs")
+    parser.add_argument("--rps", type=float, default=2.0, help="Target request rate")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to keep sending")
+    parser.add_argument("--concurrency", type=int, default=200, help="Maximum requests in flight")
+    parser.add_argument("--timeout", type=float, default=180.0, help="Per-request timeout in seconds")
+    parser.add_argument("--poisson", action="store_true", help="Exponential inter-arrival times instead of a fixed interval")
+    parser.add_argument("--boards", type=int, default=10, help="Distinct board URLs to spread requests over; fewer means more cache hits")
+    parser.add_argument("--board-url-prefix", default="https://jobs.ashbyhq.com/loadtest")
+    parser.add_argument("--num-jobs", type=int, default=10)
+    parser.add_argument("--num-recommendations", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run(args)).summary(args.rps)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_report(summary)
+    # Non-zero exit lets CI fail a run where nothing succeeded
+    sys.exit(0 if summary["succeeded"] else 1)
+
+
+if __name__ == "__main__":
+    main()
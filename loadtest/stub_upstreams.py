@@ -0,0 +1,221 @@
+"""
+Local stand-ins for the Firecrawl scrape and OpenAI chat-completions APIs, for load testing without
+spending money. Latency is drawn from a log-normal distribution per upstream, and a configurable share
+of calls fail with a 5xx or a 429, so retries, hedging, rate limiting and circuit breaking all get exercised.
+
+Usage:
+    python loadtest/stub_upstreams.py --port 8100 --openai-latency-ms 800 --error-rate 0.01
+
+Then start the API against it:
+    FIRECRAWL_API_URL=http://localhost:8100 OPENAI_BASE_URL=http://localhost:8100/v1 \\
+    OPENAI_API_KEY=stub FIRECRAWL_API_KEY=stub uvicorn app:app --port 8000
+"""
+
+import re
+import json
+import math
+import time
+import uuid
+import random
+import asyncio
+import hashlib
+import argparse
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+TITLES = ["Software Engineer", "Data Engineer", "Research Scientist", "Product Manager", "Solutions Architect",
+          "Security Engineer", "Data Scientist", "Engineering Manager", "Technical Program Manager", "Designer"]
+TEAMS = ["Applied AI", "Infrastructure", "Research", "Go To Market", "Safety Systems", "Platform", None]
+LOCATIONS = ["San Francisco", "New York City", "London", "Remote - US", "Dublin", "Tokyo"]
+SKILLS = ["Python", "SQL", "Spark", "Kubernetes", "Distributed systems", "Machine learning", "PyTorch",
+          "Data modeling", "Stakeholder management", "Go", "Rust", "TypeScript", "React", "AWS", "Terraform",
+          "Statistics", "Experimentation", "Leadership", "Communication", "Security"]
+
+
+class UpstreamProfile:
+    """Latency distribution and failure rates for one stubbed upstream"""
+
+    def __init__(self, median_ms: float, sigma: float, error_rate: float, rate_limit_rate: float):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.counters = {"requests": 0, "errors": 0, "rate_limited": 0}
+
+    def latency_seconds(self) -> float:
+        """Log-normal around the median: most calls are close to it, a few are several times slower"""
+        return random.lognormvariate(math.log(max(self.median_ms, 0.001) / 1000), self.sigma)
+
+    def failure(self) -> Optional[int]:
+        """Status code to fail this call with, or None to succeed"""
+        self.counters["requests"] += 1
+        roll = random.random()
+        if roll < self.rate_limit_rate:
+            self.counters["rate_limited"] += 1
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.counters["errors"] += 1
+            return random.choice([500, 502, 503])
+        return None
+
+
+def _seeded(*parts: str) -> random.Random:
+    return random.Random(hashlib.sha256("|".join(parts).encode()).hexdigest())
+
+
+def board_markdown(url: str, jobs_per_board: int) -> str:
+    """A board page with Ashby-style posting links, stable for a given board URL"""
+    slug = re.sub(r"[^a-z0-9-]", "-", url.rstrip("/").rsplit("/", 1)[-1].lower()) or "stub"
+    lines = [f"# {slug} careers", "[Home](https://example.com)"]
+    for index in range(jobs_per_board):
+        posting = uuid.UUID(int=_seeded(slug, str(index)).getrandbits(128))
+        lines.append(f"## Opening {index}\n[{TITLES[index % len(TITLES)]}](https://jobs.ashbyhq.com/{slug}/{posting})")
+    return "\n".join(lines)
+
+
+def job_extract(url: str) -> Dict[str, Any]:
+    """Structured fields for a posting, stable for a given posting URL"""
+    rng = _seeded(url)
+    low = rng.randrange(150, 350, 5)
+    return {
+        "job_title": f"{rng.choice(TITLES)}, {rng.choice(['Core', 'Growth', 'Enterprise', 'API'])}",
+        "location": rng.choice(LOCATIONS),
+        "compensation": f"${low}K – ${low + rng.randrange(40, 120, 5)}K",
+        "key_skills": rng.sample(SKILLS, rng.randint(4, 8)),
+        "apply_link": url,
+        "sub_division_of_organization": rng.choice(TEAMS)
+    }
+
+
+def completion_text(prompt: str) -> str:
+    """Answer the service's link-extraction and ranking prompts in the shape each one asks for"""
+    if "apply_links" in prompt:
+        return json.dumps({"apply_links": re.findall(r"https://[^\s)\]]+", prompt)})
+
+    count_match = re.search(r"top (\d+)", prompt)
+    count = int(count_match.group(1)) if count_match else 3
+    ids = re.findall(r"^(\d+)\|", prompt, re.M)
+    if ids:
+        picks: List[Dict[str, Any]] = [{"id": int(i), "match_reason": "Skills overlap with the resume"} for i in ids[:count]]
+    else:
+        picks = [
+            {"job_title": "Stub role", "compensation": None, "apply_link": link, "match_reason": "Skills overlap with the resume"}
+            for link in re.findall(r'"apply_link": "([^"]+)"', prompt)[:count]
+        ]
+    return "```json\n" + json.dumps(picks, indent=2) + "\n```"
+
+
+def create_app(firecrawl: UpstreamProfile, openai: UpstreamProfile, jobs_per_board: int, stream_chunk_chars: int) -> FastAPI:
+    app = FastAPI(title="Stub upstreams")
+
+    def error_response(status: int, upstream: str) -> JSONResponse:
+        headers = {"retry-after": "1"} if status == 429 else {}
+        if upstream == "openai":
+            body = {"error": {"message": f"stub {status}", "type": "stub_error", "code": None}}
+        else:
+            body = {"success": False, "error": f"stub {status}"}
+        return JSONResponse(body, status_code=status, headers=headers)
+
+    @app.post("/v1/scrape")
+    async def scrape(request: Request):
+        payload = await request.json()
+        await asyncio.sleep(firecrawl.latency_seconds())
+        status = firecrawl.failure()
+        if status:
+            return error_response(status, "firecrawl")
+
+        url = payload["url"]
+        if "markdown" in payload.get("formats", []):
+            data = {"markdown": board_markdown(url, jobs_per_board)}
+        else:
+            data = {"extract": job_extract(url)}
+        return {"success": True, "data": data}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        prompt = payload["messages"][-1]["content"]
+        latency = openai.latency_seconds()
+        status = openai.failure()
+        if status:
+            await asyncio.sleep(latency / 4)
+            return error_response(status, "openai")
+
+        text = completion_text(prompt)
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(text) // 4, "total_tokens": (len(prompt) + len(text)) // 4}
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        headers = {
+            "x-ratelimit-remaining-requests": "9999",
+            "x-ratelimit-reset-requests": "6ms",
+            "x-ratelimit-remaining-tokens": "1999000",
+            "x-ratelimit-reset-tokens": "30ms"
+        }
+
+        if not payload.get("stream"):
+            await asyncio.sleep(latency)
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": payload.get("model", "stub"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage
+            }, headers=headers)
+
+        # Roughly a third of the latency before the first token, the rest spread over the chunks
+        chunks = [text[i:i + stream_chunk_chars] for i in range(0, len(text), stream_chunk_chars)]
+        gap = latency * 2 / 3 / max(1, len(chunks))
+
+        async def events():
+            def event(choices: List[Dict[str, Any]], chunk_usage: Optional[Dict[str, int]] = None) -> str:
+                body = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                        "model": payload.get("model", "stub"), "choices": choices, "usage": chunk_usage}
+                return f"data: {json.dumps(body)}\n\n"
+
+            await asyncio.sleep(latency / 3)
+            for chunk in chunks:
+                yield event([{"index": 0, "delta": {"content": chunk}, "finish_reason": None}])
+                await asyncio.sleep(gap)
+            yield event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+            if payload.get("stream_options", {}).get("include_usage"):
+                yield event([], usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+    @app.get("/stats")
+    async def stats():
+        return {"firecrawl": firecrawl.counters, "openai": openai.counters}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--firecrawl-latency-ms", type=float, default=400, help="Median scrape latency")
+    parser.add_argument("--openai-latency-ms", type=float, default=1200, help="Median completion latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Log-normal shape; 0.5 puts p99 near 3x the median")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls failing with 500/502/503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of calls answered 429 with Retry-After")
+    parser.add_argument("--jobs-per-board", type=int, default=30)
+    parser.add_argument("--stream-chunk-chars", type=int, default=8)
+    args = parser.parse_args()
+
+    app = create_app(
+        UpstreamProfile(args.firecrawl_latency_ms, args.latency_sigma, args.error_rate, args.rate_limit_rate),
+        UpstreamProfile(args.openai_latency_ms, args.latency_sigma, args.error_rate, args.rate_limit_rate),
+        jobs_per_board=args.jobs_per_board,
+        stream_chunk_chars=args.stream_chunk_chars
+    )
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
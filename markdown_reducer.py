@@ -0,0 +1,133 @@
+"""
+Reduce scraped job board markdown to the link-bearing lines the link-extraction prompt needs
+"""
+
+import re
+from typing import List, Tuple
+from urllib.parse import urlsplit
+
+from token_utils import estimate_tokens
+
+IMAGE_RE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+LINK_RE = re.compile(r"\[[^\]]*\]\([^)]+\)|https?://\S+")
+LINK_PARTS_RE = re.compile(r"\[([^\]]*)\]\(([^)]+)\)|(https?://\S+)")
+EMPTY_LINK_RE = re.compile(r"\[\s*\]\([^)]*\)")
+WHITESPACE_RE = re.compile(r"\s+")
+
+# Link targets that never point at a job posting: non-http schemes, in-page anchors and social networks
+NON_JOB_SCHEMES = ("mailto:", "tel:", "javascript:", "#")
+SOCIAL_HOST_RE = re.compile(
+    r"(?:^|\.)(?:facebook|twitter|x|linkedin|instagram|youtube|tiktok|glassdoor)\.com$",
+    re.I
+)
+
+# Navigation, legal and cookie chrome common to careers pages. Job titles and slugs use the same words
+# ("Privacy Counsel", /jobs/accessibility-design-lead), so links are matched on whole path segments or
+# their complete link text, and lines without links only on footer phrases no job title contains.
+CHROME_PATH_SEGMENT_RE = re.compile(
+    r"(?:privacy|privacy[-_]policy|privacy[-_]notice|legal|imprint|impressum|cookies?|cookie[-_](?:policy|settings)|"
+    r"terms|terms[-_]of[-_](?:use|service)|tos|login|log[-_]in|signin|sign[-_]in|signup|sign[-_]up|"
+    r"accessibility|accessibility[-_]statement)",
+    re.I
+)
+CHROME_TEXT_RE = re.compile(
+    r"(?:privacy(?: policy| notice| statement)?|legal(?: notice)?|imprint|cookies?(?: policy| settings| preferences)?|"
+    r"terms(?: of (?:use|service))?|terms (?:and|&) conditions|sign in|log in|login|sign up|"
+    r"accessibility(?: statement)?|skip to (?:main )?content|manage cookies|accept(?: all)?(?: cookies)?)",
+    re.I
+)
+BOILERPLATE_RE = re.compile(
+    r"©|\ball rights reserved\b|\bpowered by\b|\bskip to (?:main )?content\b|\b(?:we|this site) uses? cookies\b|"
+    r"\bsubscribe to our newsletter\b",
+    re.I
+)
+
+# Non-link lines kept as context above a link (job titles, team headings, locations)
+CONTEXT_LINES = 2
+
+
+def _clean_line(line: str) -> str:
+    line = IMAGE_RE.sub("", line)
+    line = EMPTY_LINK_RE.sub("", line)
+    return WHITESPACE_RE.sub(" ", line).strip()
+
+
+def _links(line: str) -> List[Tuple[str, str]]:
+    """(link text, target) for every markdown link and bare URL on a line"""
+    return [(text, target or bare) for text, target, bare in LINK_PARTS_RE.findall(line)]
+
+
+def _is_non_job_target(target: str) -> bool:
+    target = target.strip()
+    if target.lower().startswith(NON_JOB_SCHEMES):
+        return True
+    return bool(SOCIAL_HOST_RE.search(urlsplit(target).hostname or ""))
+
+
+def _is_chrome_link(text: str, target: str) -> bool:
+    path = urlsplit(target.strip()).path
+    if any(CHROME_PATH_SEGMENT_RE.fullmatch(segment) for segment in path.split("/")):
+        return True
+    return bool(CHROME_TEXT_RE.fullmatch(text.strip()))
+
+
+def _is_job_link_line(line: str) -> bool:
+    return any(not _is_non_job_target(target) for _, target in _links(line))
+
+
+def _is_boilerplate(line: str) -> bool:
+    links = _links(line)
+    if not links:
+        # Headings like "## Legal" or "## Privacy Counsel" are team or title context, so only footer phrases count
+        return bool(BOILERPLATE_RE.search(line))
+    return all(_is_chrome_link(text, target) for text, target in links)
+
+
+def reduce_markdown(markdown: str, token_budget: int) -> str:
+    """
+    Collapse board markdown to link-bearing lines plus nearby title lines, fitted to a token budget.
+
+    Lines are kept whole and in page order. If the lines plus their context are over budget the
+    context lines are dropped first, and only then is the tail dropped line by line.
+    """
+    lines = [_clean_line(line) for line in markdown.splitlines()]
+    lines = [line for line in lines if line and not _is_boilerplate(line)]
+
+    is_link = [_is_job_link_line(line) for line in lines]
+    if not any(is_link):
+        # No recognisable links; give the model the cleaned page instead
+        return fit_lines_to_budget(lines, token_budget)
+
+    keep = list(is_link)
+    for index, link_line in enumerate(is_link):
+        if not link_line:
+            continue
+        for offset in range(1, CONTEXT_LINES + 1):
+            previous = index - offset
+            if previous < 0 or is_link[previous]:
+                break
+            keep[previous] = True
+
+    reduced: List[str] = [line for line, kept in zip(lines, keep) if kept]
+    if _total_tokens(reduced) > token_budget:
+        reduced = [line for line, link_line in zip(lines, is_link) if link_line]
+
+    return fit_lines_to_budget(reduced, token_budget)
+
+
+def _total_tokens(lines: List[str]) -> int:
+    return sum(estimate_tokens(line) + 1 for line in lines)
+
+
+def fit_lines_to_budget(lines: List[str], token_budget: int) -> str:
+    """Join whole lines in order until the token budget is reached"""
+    kept: List[str] = []
+    used = 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > token_budget:
+            print(f"Board markdown over budget: kept {len(kept)}/{len(lines)} lines (~{used} tokens)")
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
@@ -0,0 +1,139 @@
+"""
+Prometheus metrics for the recommendation pipeline
+"""
+
+import time
+import functools
+from contextlib import contextmanager
+from typing import Iterator, Union
+
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from starlette.routing import Match
+
+# Upstream scrapes and model calls range from ~100ms cache hits to minute-long board scrapes
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30, 45, 60, 90, 120, 180)
+
+STAGE_LATENCY = Histogram(
+    "job_pipeline_stage_seconds",
+    "Latency of each recommendation pipeline stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS
+)
+UPSTREAM_ERRORS = Counter(
+    "upstream_errors_total",
+    "Failed upstream calls by upstream and HTTP status code",
+    ["upstream", "status"]
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served, by route",
+    ["method", "route"],
+    multiprocess_mode="livesum"
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route and status, including streamed bodies",
+    ["method", "route", "status"],
+    buckets=STAGE_BUCKETS
+)
+
+
+@contextmanager
+def observe_stage(stage: str) -> Iterator[None]:
+    """Record the duration of a pipeline stage, whether it succeeds or fails"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(stage=stage).observe(time.perf_counter() - start)
+
+
+def observe_duration(stage: str, seconds: float):
+    """Record an already-measured stage duration"""
+    STAGE_LATENCY.labels(stage=stage).observe(seconds)
+
+
+def timed_stage(stage: str):
+    """Decorator recording the duration of an async function as a pipeline stage"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with observe_stage(stage):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_upstream_error(upstream: str, status: Union[int, str]):
+    """Count a failed upstream call; status is the HTTP code or a short error kind"""
+    UPSTREAM_ERRORS.labels(upstream=upstream, status=str(status)).inc()
+
+
+class ServiceStatsCollector:
+    """Expose the service's cache, single-flight and fast-path counters at scrape time"""
+
+    def __init__(self, service):
+        self.service = service
+
+    def collect(self):
+        cache = self.service.scrape_cache.stats()
+        hits = CounterMetricFamily("scrape_cache_hits", "Scrape cache hits by tier", labels=["tier"])
+        hits.add_metric(["memory"], cache["memory_hits"])
+        hits.add_metric(["disk"], cache["disk_hits"])
+        yield hits
+        yield CounterMetricFamily("scrape_cache_misses", "Scrape cache misses", value=cache["misses"])
+        yield GaugeMetricFamily("scrape_cache_hit_ratio", "Scrape cache hit ratio since startup", value=cache["hit_ratio"])
+
+        links = self.service.link_extraction_stats()
+        extraction = CounterMetricFamily("link_extraction", "Link extractions by path", labels=["path"])
+        extraction.add_metric(["pattern"], links["pattern_hits"])
+        extraction.add_metric(["llm"], links["llm_fallbacks"])
+        yield extraction
+
+        collapsed = CounterMetricFamily("single_flight_collapsed", "Calls served by another in-flight call", labels=["kind"])
+        collapsed.add_metric(["scrape"], self.service.scrape_flights.counters["collapsed"])
+        collapsed.add_metric(["link_extraction"], self.service.link_extraction_flights.counters["collapsed"])
+        yield collapsed
+
+        if self.service.job_store:
+            yield CounterMetricFamily("job_store_reused", "Postings served from the job store", value=self.service.job_store.counters["reused"])
+
+
+class MetricsMiddleware:
+    """ASGI middleware tracking in-flight requests and latency per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = self._route_template(scope)
+        method = scope["method"]
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(method=method, route=route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            HTTP_LATENCY.labels(method=method, route=route, status=str(status["code"])).observe(time.perf_counter() - start)
+
+    @staticmethod
+    def _route_template(scope) -> str:
+        """Use the matched route's path template so ids don't explode label cardinality"""
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return "unmatched"
@@ -2,12 +2,14 @@
 Pydantic models for the Job Recommendation API
 """
 
-from pydantic import BaseModel, Field, validator
-from typing import List, Optional
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Literal, Optional
 
-class JobRecommendationRequest(BaseModel):
-    """Request model for job recommendations"""
-    resume_text: str = Field(..., description="Resume text content", min_length=100)
+# How much of each analyzed job a response carries: everything, just its apply link, or nothing
+JobProjection = Literal["full", "links", "none"]
+
+class JobSearchOptions(BaseModel):
+    """Board and ranking options shared by single and batch recommendation requests"""
     jobs_page_url: Optional[str] = Field(
         default="https://jobs.ashbyhq.com/openai",
         description="URL of the jobs page to scrape"
@@ -16,7 +18,7 @@ class JobRecommendationRequest(BaseModel):
         default=5,
         description="Number of jobs to extract and analyze",
         ge=1,
-        le=20
+        le=500
     )
     num_recommendations: int = Field(
         default=3,
@@ -24,13 +26,37 @@ class JobRecommendationRequest(BaseModel):
         ge=1,
         le=10
     )
+    shortlist_size: Optional[int] = Field(
+        default=None,
+        description="Number of best lexical matches sent to the model for ranking (defaults to the server setting)",
+        ge=1,
+        le=500
+    )
+    include_jobs: JobProjection = Field(
+        default="full",
+        description="Return every analyzed job in all_jobs ('full'), only their apply links in job_links ('links'), or neither ('none')"
+    )
     
-    @validator('jobs_page_url')
+    @field_validator('jobs_page_url')
+    @classmethod
     def validate_url(cls, v):
         if v and not v.startswith(('http://', 'https://')):
             raise ValueError('URL must start with http:// or https://')
         return v
 
+class JobRecommendationRequest(JobSearchOptions):
+    """Request model for job recommendations"""
+    resume_text: str = Field(..., description="Resume text content", min_length=100)
+
+class ResumeInput(BaseModel):
+    """One candidate resume in a batch request"""
+    resume_id: Optional[str] = Field(None, description="Caller-supplied identifier echoed back in the results")
+    resume_text: str = Field(..., description="Resume text content", min_length=100)
+
+class BatchJobRecommendationRequest(JobSearchOptions):
+    """Request model for ranking one job board against many resumes"""
+    resumes: List[ResumeInput] = Field(..., description="Resumes to rank the board against", min_length=1, max_length=200)
+
 class JobData(BaseModel):
     """Model for individual job data"""
     job_title: str = Field(..., description="Job title")
@@ -47,6 +73,13 @@ class JobRecommendation(BaseModel):
     apply_link: str = Field(..., description="Application URL")
     match_reason: Optional[str] = Field(None, description="Why this job matches the candidate")
 
+class TokenUsage(BaseModel):
+    """OpenAI token usage accumulated over a request"""
+    prompt_tokens: int = Field(0, description="Prompt tokens billed")
+    completion_tokens: int = Field(0, description="Completion tokens billed")
+    total_tokens: int = Field(0, description="Prompt plus completion tokens")
+    calls: int = Field(0, description="Number of model calls made")
+
 class JobRecommendationResponse(BaseModel):
     """Response model for job recommendations"""
     success: bool = Field(..., description="Whether the operation was successful")
@@ -55,4 +88,39 @@ class JobRecommendationResponse(BaseModel):
     total_jobs_analyzed: int = Field(..., description="Number of jobs successfully analyzed")
     recommendations: List[JobRecommendation] = Field(..., description="Top job recommendations")
     all_jobs: Optional[List[JobData]] = Field(None, description="All jobs that were analyzed")
+    job_links: Optional[List[str]] = Field(None, description="Apply links of the analyzed jobs, when include_jobs is 'links'")
+    processing_time_seconds: Optional[float] = Field(None, description="Time taken to process the request")
+    board_fingerprint: Optional[str] = Field(None, description="Hash of the normalized link set on the jobs page")
+    board_unchanged: Optional[bool] = Field(None, description="Whether the jobs page matched the previous run, so stored links and job details were reused")
+    token_usage: Optional[TokenUsage] = Field(None, description="OpenAI tokens spent on this request")
+
+class RunStatus(BaseModel):
+    """Status of a background recommendation run"""
+    run_id: str = Field(..., description="Identifier used to poll the run")
+    status: Literal["queued", "running", "completed", "failed"] = Field(..., description="Current run state")
+    created_at: float = Field(..., description="Unix time the run was submitted")
+    started_at: Optional[float] = Field(None, description="Unix time a worker picked the run up")
+    finished_at: Optional[float] = Field(None, description="Unix time the run finished")
+    error: Optional[str] = Field(None, description="Error message if the run failed")
+
+class ResumeRecommendations(BaseModel):
+    """Recommendations for one resume in a batch response"""
+    resume_id: str = Field(..., description="Caller-supplied id, or the resume's position in the request")
+    success: bool = Field(..., description="Whether recommendations were generated for this resume")
+    message: str = Field(..., description="Status message")
+    recommendations: List[JobRecommendation] = Field(..., description="Top job recommendations for this resume")
+    token_usage: Optional[TokenUsage] = Field(None, description="OpenAI tokens spent ranking this resume")
+
+class BatchJobRecommendationResponse(BaseModel):
+    """Response model for batch job recommendations"""
+    success: bool = Field(..., description="Whether the operation was successful")
+    message: str = Field(..., description="Status message")
+    total_jobs_found: int = Field(..., description="Total number of jobs extracted")
+    total_jobs_analyzed: int = Field(..., description="Number of jobs successfully analyzed")
+    results: List[ResumeRecommendations] = Field(..., description="Per-resume recommendations, in request order")
+    all_jobs: Optional[List[JobData]] = Field(None, description="All jobs that were analyzed")
+    job_links: Optional[List[str]] = Field(None, description="Apply links of the analyzed jobs, when include_jobs is 'links'")
     processing_time_seconds: Optional[float] = Field(None, description="Time taken to process the request")
+    board_fingerprint: Optional[str] = Field(None, description="Hash of the normalized link set on the jobs page")
+    board_unchanged: Optional[bool] = Field(None, description="Whether the jobs page matched the previous run, so stored links and job details were reused")
+    token_usage: Optional[TokenUsage] = Field(None, description="OpenAI tokens spent on this request")
@@ -0,0 +1,77 @@
+"""
+Local lexical pre-ranking of jobs against a resume
+"""
+
+import re
+from collections import Counter
+from typing import List
+
+import numpy as np
+
+from models import JobData
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or our that the their this to
+with will you your we who what when where which years year experience experienced strong
+""".split())
+
+# BM25 parameters; titles are repeated so they weigh more than skills and divisions
+BM25_K1 = 1.5
+BM25_B = 0.75
+TITLE_WEIGHT = 2
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords"""
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def job_tokens(job: JobData) -> List[str]:
+    """Tokens for the fields that describe what a job needs"""
+    tokens = tokenize(job.job_title) * TITLE_WEIGHT
+    tokens += tokenize(" ".join(job.key_skills))
+    if job.sub_division_of_organization:
+        tokens += tokenize(job.sub_division_of_organization)
+    return tokens
+
+
+def bm25_scores(resume_text: str, jobs: List[JobData]) -> np.ndarray:
+    """Score every job against the resume with BM25, vectorized over all jobs at once"""
+    query_counts = Counter(tokenize(resume_text))
+    if not jobs or not query_counts:
+        return np.zeros(len(jobs))
+
+    vocabulary = {term: index for index, term in enumerate(query_counts)}
+    term_freqs = np.zeros((len(jobs), len(vocabulary)), dtype=np.float64)
+    doc_lengths = np.zeros(len(jobs), dtype=np.float64)
+
+    for row, job in enumerate(jobs):
+        tokens = job_tokens(job)
+        doc_lengths[row] = len(tokens)
+        for term, count in Counter(tokens).items():
+            column = vocabulary.get(term)
+            if column is not None:
+                term_freqs[row, column] = count
+
+    doc_freqs = np.count_nonzero(term_freqs, axis=0)
+    idf = np.log1p((len(jobs) - doc_freqs + 0.5) / (doc_freqs + 0.5))
+
+    avg_length = doc_lengths.mean() or 1.0
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths / avg_length)
+    saturated = term_freqs * (BM25_K1 + 1) / (term_freqs + norm[:, None])
+
+    # Terms the resume repeats count for more, with diminishing returns
+    query_weights = 1 + np.log(np.fromiter(query_counts.values(), dtype=np.float64))
+    return saturated @ (idf * query_weights)
+
+
+def shortlist_jobs(resume_text: str, jobs: List[JobData], top_k: int) -> List[JobData]:
+    """Return the top_k jobs by BM25 score, best first; every job is reordered even when top_k covers them all"""
+    if len(jobs) <= 1:
+        return jobs[:top_k]
+
+    scores = bm25_scores(resume_text, jobs)
+    order = np.argsort(-scores, kind="stable")[:top_k]
+    return [jobs[index] for index in order]
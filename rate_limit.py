@@ -0,0 +1,385 @@
+"""
+Client-side token-bucket rate limiting per upstream, adapting to rate-limit response headers
+and optionally shared by every worker process on the host through a SQLite file
+"""
+
+import os
+import re
+import time
+import asyncio
+import sqlite3
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from prometheus_client import Counter
+
+RATE_LIMIT_WAIT = Counter(
+    "rate_limit_wait_seconds_total",
+    "Time spent waiting for a client-side rate limit before calling an upstream",
+    ["upstream"]
+)
+RATE_LIMITED = Counter(
+    "rate_limited_responses_total",
+    "429 responses received from an upstream",
+    ["upstream"]
+)
+
+# (bucket name, refill rate per second, capacity, cost)
+BucketRequest = Tuple[str, float, float, float]
+
+# Refill rate standing in for "no limit": the bucket only matters while a Retry-After block is active
+UNLIMITED_RATE = 1e9
+
+# How long an unlimited limiter trusts its last look at the shared block marker
+BLOCK_CHECK_SECONDS = 0.1
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds from a reset header: plain seconds, an epoch timestamp, or OpenAI's '1m20.5s' / '250ms' form"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        parts = _DURATION_PART.findall(value)
+        if not parts:
+            return None
+        scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+        return sum(float(amount) * scale[unit] for amount, unit in parts)
+    # Some APIs send the reset time as a Unix timestamp rather than a delay
+    return max(0.0, seconds - time.time()) if seconds > 1e9 else seconds
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Seconds to wait from Retry-After (seconds or HTTP date) or retry-after-ms"""
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class MemoryBucketStore:
+    """Bucket state for a single process"""
+
+    def __init__(self):
+        self._buckets: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, requests: List[BucketRequest]) -> float:
+        """Take every cost at once if all buckets allow it; otherwise return the seconds to wait"""
+        with self._lock:
+            states = {name: self._buckets.get(name) for name, _, _, _ in requests}
+            wait, updated = _take(requests, states, time.time())
+            if wait <= 0:
+                self._buckets.update(updated)
+            return wait
+
+    def adjust(self, name: str, rate: float, capacity: float, remaining: Optional[float] = None, blocked_until: Optional[float] = None):
+        """Lower the bucket to what the upstream says is left, and/or block it until a time"""
+        with self._lock:
+            self._buckets[name] = _adjust(self._buckets.get(name), rate, capacity, remaining, blocked_until, time.time())
+
+    def blocked_until(self, names: List[str]) -> float:
+        """Latest block recorded on any of the buckets, 0 if none"""
+        with self._lock:
+            return max((self._buckets[name]["blocked_until"] for name in names if name in self._buckets), default=0.0)
+
+    def close(self):
+        pass
+
+
+class SqliteBucketStore:
+    """Bucket state in a SQLite file, so every worker process on the host draws from the same buckets"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Autocommit mode so BEGIN IMMEDIATE controls the cross-process write lock explicitly
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL stays consistent without an fsync per commit; losing the last few updates in a crash is harmless here
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                name TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                blocked_until REAL NOT NULL
+            )
+        """)
+
+    def take(self, requests: List[BucketRequest]) -> float:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                states = {name: self._load(name) for name, _, _, _ in requests}
+                wait, updated = _take(requests, states, time.time())
+                if wait <= 0:
+                    for name, state in updated.items():
+                        self._save(name, state)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return wait
+
+    def adjust(self, name: str, rate: float, capacity: float, remaining: Optional[float] = None, blocked_until: Optional[float] = None):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                state = _adjust(self._load(name), rate, capacity, remaining, blocked_until, time.time())
+                self._save(name, state)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def blocked_until(self, names: List[str]) -> float:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT MAX(blocked_until) FROM rate_limit_buckets WHERE name IN ({', '.join('?' * len(names))})", names
+            ).fetchone()
+            return row[0] or 0.0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _load(self, name: str) -> Optional[Dict[str, float]]:
+        row = self._conn.execute(
+            "SELECT tokens, updated_at, blocked_until FROM rate_limit_buckets WHERE name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"tokens": row[0], "updated_at": row[1], "blocked_until": row[2]}
+
+    def _save(self, name: str, state: Dict[str, float]):
+        self._conn.execute(
+            """
+            INSERT INTO rate_limit_buckets (name, tokens, updated_at, blocked_until) VALUES (?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                tokens = excluded.tokens,
+                updated_at = excluded.updated_at,
+                blocked_until = excluded.blocked_until
+            """,
+            (name, state["tokens"], state["updated_at"], state["blocked_until"])
+        )
+
+
+def _take(requests: List[BucketRequest], states: Dict[str, Optional[Dict[str, float]]], now: float) -> Tuple[float, Dict[str, Dict[str, float]]]:
+    """Refill each bucket to now and work out whether all costs fit; shared by both stores"""
+    wait = 0.0
+    updated = {}
+    for name, rate, capacity, cost in requests:
+        state = states.get(name) or {"tokens": capacity, "updated_at": now, "blocked_until": 0.0}
+        tokens = min(capacity, state["tokens"] + max(0.0, now - state["updated_at"]) * rate)
+        # A single request larger than the bucket would otherwise wait forever
+        cost = min(cost, capacity)
+        if state["blocked_until"] > now:
+            wait = max(wait, state["blocked_until"] - now)
+        elif tokens < cost:
+            wait = max(wait, (cost - tokens) / rate)
+        updated[name] = {"tokens": tokens - cost, "updated_at": now, "blocked_until": state["blocked_until"]}
+    return wait, updated
+
+
+def _adjust(
+    state: Optional[Dict[str, float]],
+    rate: float,
+    capacity: float,
+    remaining: Optional[float],
+    blocked_until: Optional[float],
+    now: float
+) -> Dict[str, float]:
+    """Refill the bucket to now, then apply the upstream's remaining count and block; shared by both stores"""
+    state = dict(state or {"tokens": capacity, "updated_at": now, "blocked_until": 0.0})
+    if remaining is not None:
+        # Refill first so the sync doesn't discard tokens earned since the last update, then trust the upstream if lower
+        tokens = min(capacity, state["tokens"] + max(0.0, now - state["updated_at"]) * rate)
+        state["tokens"] = min(tokens, remaining)
+        state["updated_at"] = now
+    if blocked_until is not None:
+        state["blocked_until"] = max(state["blocked_until"], blocked_until)
+    return state
+
+
+class RateLimiter:
+    """
+    Request-rate and (optionally) token-rate buckets for one upstream. Callers acquire before each
+    request and report response headers afterwards so the buckets track the provider's own counters.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        store,
+        requests_per_second: float = 0.0,
+        tokens_per_minute: float = 0.0,
+        burst_seconds: float = 1.0
+    ):
+        self.name = name
+        self.store = store
+        self.requests_per_second = requests_per_second
+        self.tokens_per_minute = tokens_per_minute
+        self.burst_seconds = burst_seconds
+        # Latest block seen, from this process or the shared store, so unlimited limiters only take from buckets while blocked
+        self._blocked_until = 0.0
+        self._block_checked_at = 0.0
+        self.counters = {"acquired": 0, "waits": 0, "waited_seconds": 0.0, "rate_limited": 0}
+
+    @classmethod
+    def from_env(cls, name: str, prefix: str, store) -> "RateLimiter":
+        """Build a limiter from <PREFIX>_RATE_LIMIT_* environment variables (0 leaves a rate unlimited)"""
+        return cls(
+            name,
+            store,
+            requests_per_second=float(os.getenv(f"{prefix}_RATE_LIMIT_RPS", "0")),
+            tokens_per_minute=float(os.getenv(f"{prefix}_RATE_LIMIT_TPM", "0")),
+            burst_seconds=float(os.getenv("RATE_LIMIT_BURST_SECONDS", "1"))
+        )
+
+    async def acquire(self, tokens: float = 0):
+        """Wait until a request (costing `tokens` model tokens) fits within every bucket"""
+        requests = self._bucket_requests(tokens)
+        self.counters["acquired"] += 1
+        if self._unlimited(requests) and not await self._known_block(requests):
+            # Nothing to meter and no block from any worker: skip taking from the buckets
+            return
+        waited = 0.0
+        while True:
+            wait = await asyncio.to_thread(self.store.take, requests)
+            if wait <= 0:
+                break
+            # Re-check rather than sleeping the full wait: other workers' header updates may change it
+            pause = min(wait, 5.0)
+            waited += pause
+            await asyncio.sleep(pause)
+        if waited:
+            self.counters["waits"] += 1
+            self.counters["waited_seconds"] += waited
+            RATE_LIMIT_WAIT.labels(upstream=self.name).inc(waited)
+
+    async def try_acquire(self, tokens: float = 0) -> bool:
+        """Take a permit only if one is available right now, for optional calls such as hedged duplicates"""
+        requests = self._bucket_requests(tokens)
+        if self._unlimited(requests) and not await self._known_block(requests):
+            return True
+        if await asyncio.to_thread(self.store.take, requests) > 0:
+            return False
+        self.counters["acquired"] += 1
+        return True
+
+    async def observe(self, status_code: int, headers: Mapping[str, str]):
+        """Adapt the buckets to a response: honour Retry-After and sync to the provider's remaining quota"""
+        now = time.time()
+        adjustments = []
+        if status_code == 429:
+            self.counters["rate_limited"] += 1
+            RATE_LIMITED.labels(upstream=self.name).inc()
+
+        retry_after = parse_retry_after(headers)
+        if retry_after is None and status_code == 429:
+            # No hint from the upstream: pause briefly rather than hammering it
+            retry_after = 1.0
+        if retry_after is not None and status_code in (429, 503):
+            adjustments.append(("requests", None, now + retry_after))
+
+        # OpenAI style per-kind headers, falling back to the generic x-ratelimit-remaining / -reset pair
+        for kind in ("requests", "tokens"):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            reset = headers.get(f"x-ratelimit-reset-{kind}")
+            if kind == "requests" and remaining is None:
+                remaining, reset = headers.get("x-ratelimit-remaining"), headers.get("x-ratelimit-reset")
+            if remaining is None:
+                continue
+            try:
+                remaining_value = float(remaining)
+            except ValueError:
+                continue
+            reset_seconds = parse_duration(reset)
+            blocked_until = now + reset_seconds if remaining_value <= 0 and reset_seconds else None
+            if blocked_until is None and not self._limit(kind):
+                # An unlimited bucket refills instantly, so only a block is worth recording
+                continue
+            adjustments.append((kind, remaining_value, blocked_until))
+
+        for _, _, blocked_until in adjustments:
+            if blocked_until is not None:
+                self._blocked_until = max(self._blocked_until, blocked_until)
+        if adjustments:
+            await asyncio.to_thread(self._apply, adjustments)
+
+    def _apply(self, adjustments: List[Tuple[str, Optional[float], Optional[float]]]):
+        for kind, remaining, blocked_until in adjustments:
+            rate, capacity = self._bucket_shape(kind)
+            self.store.adjust(self._bucket(kind), rate, capacity, remaining=remaining, blocked_until=blocked_until)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "waited_seconds": round(self.counters["waited_seconds"], 3),
+            "requests_per_second": self.requests_per_second or None,
+            "tokens_per_minute": self.tokens_per_minute or None
+        }
+
+    def _bucket(self, kind: str) -> str:
+        return f"{self.name}:{kind}"
+
+    async def _known_block(self, requests: List[BucketRequest]) -> bool:
+        """Whether a block is active, re-reading the marker other workers write at most every BLOCK_CHECK_SECONDS"""
+        now = time.time()
+        if now < self._blocked_until:
+            return True
+        if now - self._block_checked_at >= BLOCK_CHECK_SECONDS:
+            self._block_checked_at = now
+            names = [name for name, _, _, _ in requests]
+            self._blocked_until = max(self._blocked_until, await asyncio.to_thread(self.store.blocked_until, names))
+        return now < self._blocked_until
+
+    def _limit(self, kind: str) -> float:
+        return self.requests_per_second if kind == "requests" else self.tokens_per_minute
+
+    def _bucket_shape(self, kind: str) -> Tuple[float, float]:
+        """Refill rate per second and capacity of a bucket; unlimited rates refill effectively instantly"""
+        if kind == "requests":
+            rps = self.requests_per_second or UNLIMITED_RATE
+            return rps, max(1.0, rps * self.burst_seconds)
+        if self.tokens_per_minute:
+            # Token limits are per minute, so the bucket holds up to a minute's allowance
+            return self.tokens_per_minute / 60, self.tokens_per_minute
+        return UNLIMITED_RATE, UNLIMITED_RATE
+
+    def _unlimited(self, requests: List[BucketRequest]) -> bool:
+        return all(rate >= UNLIMITED_RATE for _, rate, _, _ in requests)
+
+    def _bucket_requests(self, tokens: float) -> List[BucketRequest]:
+        # Unlimited rates still get a bucket so Retry-After blocks apply while one is active
+        requests = [(self._bucket("requests"), *self._bucket_shape("requests"), 1.0)]
+        if self.tokens_per_minute and tokens:
+            requests.append((self._bucket("tokens"), *self._bucket_shape("tokens"), tokens))
+        return requests
+
+
+def bucket_store_from_env():
+    """Shared SQLite store if RATE_LIMIT_STATE_PATH is set, otherwise per-process state"""
+    path = os.getenv("RATE_LIMIT_STATE_PATH", "data/rate_limits.db")
+    return SqliteBucketStore(path) if path else MemoryBucketStore()
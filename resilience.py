@@ -0,0 +1,261 @@
+"""
+Upstream resilience: per-attempt timeouts, jittered retries, hedged requests and circuit breaking
+"""
+
+import os
+import time
+import random
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from prometheus_client import Counter, Gauge
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: timeouts, rate limits and transient server errors
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+UPSTREAM_RETRIES = Counter(
+    "upstream_retries_total",
+    "Upstream call attempts retried after a retryable failure",
+    ["upstream"]
+)
+UPSTREAM_HEDGES = Counter(
+    "upstream_hedges_total",
+    "Hedged duplicate requests, by whether the hedge finished first",
+    ["upstream", "outcome"]
+)
+CIRCUIT_STATE = Gauge(
+    "upstream_circuit_open",
+    "1 while an upstream's circuit breaker is open or half-open, 0 when closed",
+    ["upstream"],
+    multiprocess_mode="livemax"
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the upstream while its circuit breaker is open"""
+
+    def __init__(self, upstream: str, retry_in: float):
+        super().__init__(f"{upstream} circuit open, retrying in {retry_in:.1f}s")
+        self.upstream = upstream
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures, fails fast for `reset_seconds`,
+    then lets a single trial call through (half-open) to decide whether to close again
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.counters = {"opened": 0, "rejected": 0}
+
+    def before_call(self):
+        """Raise CircuitOpenError if calls should not reach the upstream right now"""
+        if self.failure_threshold <= 0 or self.state == "closed":
+            return
+        elapsed = time.monotonic() - self.opened_at
+        if elapsed >= self.reset_seconds:
+            # Re-arm the timer so at most one trial call goes through per reset period
+            self.state = "half_open"
+            self.opened_at = time.monotonic()
+            return
+        self.counters["rejected"] += 1
+        raise CircuitOpenError(self.name, max(0.0, self.reset_seconds - elapsed))
+
+    def record_success(self):
+        self.failures = 0
+        if self.state != "closed":
+            print(f"{self.name} circuit closed")
+            self.state = "closed"
+            CIRCUIT_STATE.labels(upstream=self.name).set(0)
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failure_threshold <= 0:
+            return
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                print(f"{self.name} circuit opened after {self.failures} failures")
+                self.counters["opened"] += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            CIRCUIT_STATE.labels(upstream=self.name).set(1)
+
+
+class LatencyWindow:
+    """Recent successful call durations, for picking a hedging delay"""
+
+    def __init__(self, size: int = 200):
+        self.samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, pct: float, min_samples: int = 20) -> Optional[float]:
+        """The pct-th percentile of recent durations, or None until enough samples exist"""
+        if len(self.samples) < min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Upstream:
+    """Resilience policy for one upstream service, shared by every call made to it"""
+
+    def __init__(
+        self,
+        name: str,
+        timeout_seconds: Optional[float] = None,
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        hedge_percentile: float = 0.0,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+        limiter=None
+    ):
+        self.name = name
+        self.limiter = limiter
+        self.timeout_seconds = timeout_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_percentile = hedge_percentile
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_seconds)
+        self.latency = LatencyWindow()
+        self.counters = {"calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "hedges_skipped": 0, "failures": 0}
+
+    @classmethod
+    def from_env(cls, name: str, prefix: str, timeout_seconds: float, limiter=None) -> "Upstream":
+        """Build a policy from <PREFIX>_* environment variables"""
+        return cls(
+            name,
+            timeout_seconds=float(os.getenv(f"{prefix}_TIMEOUT_SECONDS", str(timeout_seconds))),
+            max_attempts=int(os.getenv(f"{prefix}_MAX_ATTEMPTS", "3")),
+            base_delay=float(os.getenv(f"{prefix}_RETRY_BASE_DELAY_SECONDS", "0.5")),
+            max_delay=float(os.getenv(f"{prefix}_RETRY_MAX_DELAY_SECONDS", "8")),
+            hedge_percentile=float(os.getenv(f"{prefix}_HEDGE_PERCENTILE", "0")),
+            failure_threshold=int(os.getenv(f"{prefix}_BREAKER_FAILURES", "5")),
+            reset_seconds=float(os.getenv(f"{prefix}_BREAKER_RESET_SECONDS", "30")),
+            limiter=limiter
+        )
+
+    async def call(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        retryable: Callable[[BaseException], bool],
+        hedge: bool = True,
+        cost: float = 0
+    ) -> T:
+        """
+        Run fn() under the policy. Only failures `retryable` accepts are retried and count
+        against the circuit breaker; anything else is the caller's problem and is raised at once.
+        Each attempt first waits for the rate limiter, if any, outside the attempt timeout;
+        `cost` is the model tokens the call is expected to use.
+        """
+        self.counters["calls"] += 1
+        attempt = 0
+        while True:
+            attempt += 1
+            self.breaker.before_call()
+            if self.limiter is not None:
+                await self.limiter.acquire(cost)
+            try:
+                result = await self._attempt(fn, hedge, cost)
+            except Exception as e:
+                if not retryable(e):
+                    # The upstream answered, it just didn't like the request
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if attempt >= self.max_attempts or self.breaker.state == "open":
+                    self.counters["failures"] += 1
+                    raise
+                delay = self.backoff(attempt)
+                self.counters["retries"] += 1
+                UPSTREAM_RETRIES.labels(upstream=self.name).inc()
+                print(f"{self.name} attempt {attempt} failed ({type(e).__name__}: {str(e)[:80]}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number `attempt`"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return call counters and the breaker state"""
+        return {
+            **self.counters,
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.counters["opened"],
+            "circuit_rejected": self.breaker.counters["rejected"],
+            "hedge_after_seconds": self._hedge_delay()
+        }
+
+    def _hedge_delay(self) -> Optional[float]:
+        if self.hedge_percentile <= 0:
+            return None
+        return self.latency.percentile(self.hedge_percentile)
+
+    async def _attempt(self, fn: Callable[[], Awaitable[T]], hedge: bool, cost: float = 0) -> T:
+        """
+        One attempt, hedged with a duplicate request if the first is slower than usual. The duplicate is
+        a real upstream call, so it needs its own rate limiter permit; without one straight away it is skipped.
+        """
+        start = time.monotonic()
+        hedge_delay = self._hedge_delay() if hedge else None
+        if hedge_delay is None:
+            result = await self._timed(fn)
+            self.latency.add(time.monotonic() - start)
+            return result
+
+        primary = asyncio.ensure_future(self._timed(fn))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+            if not done and self.limiter is not None and not await self.limiter.try_acquire(cost):
+                self.counters["hedges_skipped"] += 1
+                await asyncio.wait({primary})
+            if primary.done():
+                result = primary.result()
+                self.latency.add(time.monotonic() - start)
+                return result
+
+            self.counters["hedges"] += 1
+            hedged = asyncio.ensure_future(self._timed(fn))
+            tasks.append(hedged)
+            pending = {primary, hedged}
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    won = task is hedged
+                    self.counters["hedge_wins"] += int(won)
+                    UPSTREAM_HEDGES.labels(upstream=self.name, outcome="won" if won else "lost").inc()
+                    self.latency.add(time.monotonic() - start)
+                    return task.result()
+            raise error
+        finally:
+            # Also reached when the caller is cancelled: never leave a request running unobserved
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _timed(self, fn: Callable[[], Awaitable[T]]) -> T:
+        if self.timeout_seconds:
+            return await asyncio.wait_for(fn(), self.timeout_seconds)
+        return await fn()
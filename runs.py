@@ -0,0 +1,238 @@
+"""
+Background execution of recommendation runs submitted through the async job API
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from models import JobRecommendationRequest, JobRecommendationResponse, RunStatus
+
+
+class QueueFullError(Exception):
+    """Raised when the run queue is at capacity"""
+
+
+class RunStore:
+    """SQLite record of run statuses and results, so any worker process can answer polls for any run"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                result TEXT,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls) -> Optional["RunStore"]:
+        """Build a store from RUN_STORE_PATH; None if disabled"""
+        path = os.getenv("RUN_STORE_PATH", "data/runs.db")
+        return cls(path) if path else None
+
+    async def save(self, run: RunStatus, result: Optional[JobRecommendationResponse] = None):
+        await asyncio.to_thread(self._save, run, result)
+
+    async def get_status(self, run_id: str) -> Optional[RunStatus]:
+        row = await asyncio.to_thread(self._get, run_id, "status")
+        return RunStatus.model_validate_json(row) if row else None
+
+    async def get_result(self, run_id: str) -> Optional[JobRecommendationResponse]:
+        row = await asyncio.to_thread(self._get, run_id, "result")
+        return JobRecommendationResponse.model_validate_json(row) if row else None
+
+    async def prune(self, max_history: int):
+        """Keep only the newest `max_history` runs across all workers"""
+        await asyncio.to_thread(self._prune, max_history)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _save(self, run: RunStatus, result: Optional[JobRecommendationResponse]):
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO runs (run_id, status, result, created_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(run_id) DO UPDATE SET
+                    status = excluded.status,
+                    result = COALESCE(excluded.result, runs.result)
+                """,
+                (run.run_id, run.model_dump_json(), result.model_dump_json() if result else None, run.created_at)
+            )
+            self._conn.commit()
+
+    def _get(self, run_id: str, column: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {column} FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return row[0] if row else None
+
+    def _prune(self, max_history: int):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM runs WHERE run_id NOT IN (SELECT run_id FROM runs ORDER BY created_at DESC LIMIT ?)",
+                (max_history,)
+            )
+            self._conn.commit()
+
+
+class RunManager:
+    """Queue of recommendation runs executed by a fixed pool of background workers"""
+
+    def __init__(
+        self,
+        service,
+        num_workers: int = 2,
+        max_queue: int = 100,
+        max_history: int = 1000,
+        store: Optional[RunStore] = None
+    ):
+        self.service = service
+        self.store = store
+        self.num_workers = num_workers
+        self.max_history = max_history
+
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=max_queue)
+        self._runs: "OrderedDict[str, RunStatus]" = OrderedDict()
+        self._requests: Dict[str, JobRecommendationRequest] = {}
+        self._results: Dict[str, JobRecommendationResponse] = {}
+        self._workers: List[asyncio.Task] = []
+
+    @classmethod
+    def from_env(cls, service) -> "RunManager":
+        """Build a run manager from RUN_* environment variables"""
+        return cls(
+            service,
+            num_workers=int(os.getenv("RUN_WORKERS", "2")),
+            max_queue=int(os.getenv("RUN_QUEUE_MAX", "100")),
+            max_history=int(os.getenv("RUN_HISTORY_MAX", "1000")),
+            store=RunStore.from_env()
+        )
+
+    async def start(self):
+        """Start the worker pool"""
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"run-worker-{index}")
+            for index in range(self.num_workers)
+        ]
+
+    async def stop(self):
+        """Cancel the worker pool; runs still queued are abandoned"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self.store:
+            self.store.close()
+
+    async def submit(self, request: JobRecommendationRequest) -> RunStatus:
+        """Persist and enqueue a run, returning a snapshot of its queued status"""
+        if self._queue.full():
+            raise QueueFullError(f"Run queue is full ({self._queue.maxsize} runs waiting)")
+
+        run = RunStatus(run_id=uuid.uuid4().hex, status="queued", created_at=time.time())
+        # Workers update the run in place, so the caller gets a copy taken before any worker can see it
+        queued = run.model_copy()
+        self._runs[run.run_id] = run
+        self._requests[run.run_id] = request
+        self._prune_history()
+        if self.store:
+            await self.store.save(run)
+            await self.store.prune(self.max_history)
+
+        try:
+            self._queue.put_nowait(run.run_id)
+        except asyncio.QueueFull:
+            # Another submit filled the queue while this one was being persisted
+            self._requests.pop(run.run_id, None)
+            run.status = "failed"
+            run.error = "Run queue is full"
+            run.finished_at = time.time()
+            if self.store:
+                await self.store.save(run)
+            raise QueueFullError(f"Run queue is full ({self._queue.maxsize} runs waiting)")
+        return queued
+
+    async def get_status(self, run_id: str) -> Optional[RunStatus]:
+        """Return the status of a run, or None if unknown; runs owned by other workers come from the store"""
+        run = self._runs.get(run_id)
+        if run is None and self.store:
+            run = await self.store.get_status(run_id)
+        return run
+
+    async def get_result(self, run_id: str) -> Optional[JobRecommendationResponse]:
+        """Return the result of a completed run, or None if not available"""
+        result = self._results.get(run_id)
+        if result is None and self.store:
+            result = await self.store.get_result(run_id)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        """Return queue depth and run counts by status"""
+        counts = {"queued": 0, "running": 0, "completed": 0, "failed": 0}
+        for run in self._runs.values():
+            counts[run.status] += 1
+        return {"workers": len(self._workers), "queue_depth": self._queue.qsize(), **counts}
+
+    async def _worker(self):
+        while True:
+            run_id = await self._queue.get()
+            try:
+                await self._execute(run_id)
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, run_id: str):
+        run = self._runs.get(run_id)
+        request = self._requests.pop(run_id, None)
+        if run is None or request is None:
+            return
+
+        run.status = "running"
+        run.started_at = time.time()
+        if self.store:
+            await self.store.save(run)
+        print(f"Run {run_id} started")
+        try:
+            self._results[run_id] = await self.service.get_job_recommendations(
+                resume_text=request.resume_text,
+                jobs_page_url=request.jobs_page_url,
+                num_jobs=request.num_jobs,
+                num_recommendations=request.num_recommendations,
+                shortlist_size=request.shortlist_size,
+                include_jobs=request.include_jobs
+            )
+            run.status = "completed"
+        except Exception as e:
+            run.status = "failed"
+            run.error = str(e)
+        run.finished_at = time.time()
+        if self.store:
+            await self.store.save(run, self._results.get(run_id))
+        print(f"Run {run_id} {run.status} in {run.finished_at - run.started_at:.2f}s")
+
+    def _prune_history(self):
+        """Forget the oldest finished runs once history exceeds its bound"""
+        excess = len(self._runs) - self.max_history
+        if excess <= 0:
+            return
+        for run_id in [run_id for run_id, run in self._runs.items() if run.finished_at is not None][:excess]:
+            del self._runs[run_id]
+            self._results.pop(run_id, None)
@@ -5,162 +5,729 @@ Service layer for job recommendation functionality
 import os
 import json
 import time
-import requests
-from typing import List, Optional
-from openai import OpenAI
-from models import JobData, JobRecommendation, JobRecommendationResponse
+import asyncio
+import hashlib
+import importlib.util
+import httpx
+import threading
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlparse
+from models import (
+    JobData,
+    JobProjection,
+    JobRecommendation,
+    JobRecommendationResponse,
+    ResumeInput,
+    ResumeRecommendations,
+    BatchJobRecommendationResponse
+)
+from cache import ScrapeCache
+from job_encoding import PROMPT_ENCODINGS, build_ranking_prompt, recommendations_from_response
+from job_store import JobStore, board_fingerprint
+from json_stream import JsonArrayStream
+from link_extractors import extract_ats_links
+from markdown_reducer import reduce_markdown
+from rate_limit import RateLimiter, bucket_store_from_env
+from resilience import RETRYABLE_STATUSES, Upstream
+from singleflight import SingleFlight
+from token_utils import estimate_tokens, truncate_to_tokens
+from usage import track_usage, record_usage, record_compaction
+from metrics import observe_stage, observe_duration, timed_stage, record_upstream_error
+
+FIRECRAWL_API_URL = "https://api.firecrawl.dev"
+
+# Firecrawl waits for the page and runs actions server-side, so reads can take a while
+FIRECRAWL_TIMEOUT = httpx.Timeout(90.0, connect=10.0)
+
+# HTTP/2 needs the optional h2 package (installed via httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class FirecrawlError(Exception):
+    """Raised when a Firecrawl scrape fails or returns an unsuccessful result"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _is_retryable_firecrawl_error(error: BaseException) -> bool:
+    if isinstance(error, FirecrawlError):
+        return error.status_code in RETRYABLE_STATUSES
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+
+def _is_retryable_openai_error(error: BaseException) -> bool:
+    import openai
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUSES
+    return isinstance(error, (openai.APIConnectionError, asyncio.TimeoutError))
+
+
+def job_fields(job_data: List[JobData], include_jobs: JobProjection = "full") -> Dict[str, Any]:
+    """Response fields describing the analyzed jobs, projected down to what the client asked for"""
+    if include_jobs == "full":
+        return {"all_jobs": job_data}
+    if include_jobs == "links":
+        return {"job_links": [job.apply_link for job in job_data]}
+    return {}
+
+
+class BoardLinks(NamedTuple):
+    """Job links found on a board, with the board fingerprint and whether it matched the last run"""
+    job_links: List[str]
+    fingerprint: Optional[str]
+    unchanged: bool
+
 
 class JobRecommendationService:
     """Service class for job recommendation operations"""
     
-    def __init__(self):
-        self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    def __init__(self, max_concurrency_per_host: Optional[int] = None):
+        # Client-side rate limits, shared with the other workers on this host when the store is a file
+        self.rate_limit_store = bucket_store_from_env()
+        self.firecrawl_limiter = RateLimiter.from_env("firecrawl", "FIRECRAWL", self.rate_limit_store)
+        self.openai_limiter = RateLimiter.from_env("openai", "OPENAI", self.rate_limit_store)
+        
+        # Timeouts, retries, hedging and circuit breaking for each upstream
+        self.firecrawl_upstream = Upstream.from_env("firecrawl", "FIRECRAWL", timeout_seconds=120.0, limiter=self.firecrawl_limiter)
+        self.openai_upstream = Upstream.from_env("openai", "OPENAI", timeout_seconds=60.0, limiter=self.openai_limiter)
+        
+        # The OpenAI SDK is slow to import, so its client is built on first use or warmed after startup
+        self._openai_client = None
+        self._openai_client_lock = threading.Lock()
+        self._warmup_task: Optional[asyncio.Task] = None
         self.firecrawl_api_key = os.getenv("FIRECRAWL_API_KEY")
+        # Pointed at a local stand-in by the load-test harness (loadtest/stub_upstreams.py)
+        self.firecrawl_scrape_url = os.getenv("FIRECRAWL_API_URL", FIRECRAWL_API_URL).rstrip("/") + "/v1/scrape"
+        
+        # Cap on simultaneous detail scrapes against any single job board host
+        self.max_concurrency_per_host = max_concurrency_per_host or int(
+            os.getenv("SCRAPE_MAX_CONCURRENCY_PER_HOST", "5")
+        )
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        
+        # Board pages change more often than individual postings, so they expire sooner
+        self.scrape_cache = ScrapeCache.from_env()
+        self.board_cache_ttl_seconds = float(os.getenv("SCRAPE_CACHE_BOARD_TTL_SECONDS", "900"))
+        # How long one worker may hold a page before others stop waiting for it and scrape it themselves
+        self.scrape_lease_seconds = float(os.getenv("SCRAPE_CACHE_LEASE_SECONDS", "180"))
+        
+        # Durable corpus of extracted postings so warm boards need few or no detail scrapes
+        self.job_store = JobStore.from_env()
+        
+        # Coalesce identical in-flight scrapes and link-extraction prompts
+        self.scrape_flights = SingleFlight()
+        self.link_extraction_flights = SingleFlight()
+        
+        # How often known ATS URL patterns let us skip the link-extraction LLM call
+        self.link_extraction_counters: Dict[str, Any] = {
+            "pattern_hits": 0,
+            "llm_fallbacks": 0,
+            "by_ats": {}
+        }
+        
+        # Token budget for the board markdown sent to the link-extraction prompt
+        self.link_prompt_token_budget = int(os.getenv("LINK_PROMPT_TOKEN_BUDGET", "12000"))
+        
+        # How jobs are written into the ranking prompt: one compact line per job, or the original indented JSON
+        self.job_prompt_encoding = os.getenv("JOB_PROMPT_ENCODING", "compact")
+        if self.job_prompt_encoding not in PROMPT_ENCODINGS:
+            raise ValueError(f"JOB_PROMPT_ENCODING must be one of {', '.join(PROMPT_ENCODINGS)}")
+        
+        # Hard token budgets for the ranking prompt and the resume context inside it
+        self.ranking_prompt_token_budget = int(os.getenv("RANKING_PROMPT_TOKEN_BUDGET", "16000"))
+        self.resume_token_budget = int(os.getenv("RESUME_TOKEN_BUDGET", "3000"))
+        
+        # Jobs kept by the local BM25 pre-ranking before the ranking prompt
+        self.default_shortlist_size = int(os.getenv("RANKING_SHORTLIST_SIZE", "10"))
+        
+        # Jobs per ranking prompt, and how many chunk prompts may run at once when ranking large boards
+        self.ranking_chunk_size = max(2, int(os.getenv("RANKING_CHUNK_SIZE", "20")))
+        self._ranking_semaphore = asyncio.Semaphore(int(os.getenv("RANKING_MAX_CONCURRENCY", "8")))
+        
+        # Resumes ranked at once by the batch endpoint
+        self._batch_semaphore = asyncio.Semaphore(int(os.getenv("BATCH_MAX_CONCURRENCY", "8")))
+        
+        # Long-lived pooled Firecrawl client, created in startup() and closed in shutdown()
+        self.http_client: Optional[httpx.AsyncClient] = None
     
+    def upstream_stats(self) -> Dict[str, Any]:
+        """Return retry, hedging, circuit breaker and rate limit counters per upstream"""
+        return {
+            "firecrawl": {**self.firecrawl_upstream.stats(), "rate_limit": self.firecrawl_limiter.stats()},
+            "openai": {**self.openai_upstream.stats(), "rate_limit": self.openai_limiter.stats()}
+        }
+    
+    def link_extraction_stats(self) -> Dict[str, Any]:
+        """Return counters for the rule-based vs LLM link extraction paths"""
+        counters = self.link_extraction_counters
+        total = counters["pattern_hits"] + counters["llm_fallbacks"]
+        return {
+            **counters,
+            "fast_path_ratio": round(counters["pattern_hits"] / total, 4) if total else 0.0
+        }
+    
+    async def startup(self):
+        """Create long-lived upstream clients; the OpenAI client is warmed in the background so readiness doesn't wait on it"""
+        self._get_http_client()
+        self._warmup_task = asyncio.create_task(asyncio.to_thread(self._warm_openai_client))
+    
+    async def shutdown(self):
+        """Close upstream clients and release pooled connections"""
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
+        if self._warmup_task is not None:
+            # A thread can't be cancelled; let it finish so the client it builds gets closed too
+            await self._warmup_task
+            self._warmup_task = None
+        if self._openai_client is not None:
+            await self._openai_client.close()
+            self._openai_client = None
+        if self.job_store:
+            self.job_store.close()
+        self.scrape_cache.close()
+        self.rate_limit_store.close()
+    
+    @property
+    def openai_client(self):
+        """The shared AsyncOpenAI client, created on first use"""
+        return self._get_openai_client()
+    
+    def _warm_openai_client(self):
+        try:
+            self._get_openai_client()
+        except Exception as e:
+            print(f"OpenAI client not ready: {str(e)}")
+    
+    def _get_openai_client(self):
+        if self._openai_client is None:
+            with self._openai_client_lock:
+                if self._openai_client is None:
+                    from openai import AsyncOpenAI
+                    # Retries are handled by openai_upstream, so the SDK's own retry loop is disabled
+                    self._openai_client = AsyncOpenAI(
+                        api_key=os.getenv("OPENAI_API_KEY"),
+                        timeout=self.openai_upstream.timeout_seconds,
+                        max_retries=0
+                    )
+        return self._openai_client
+    
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Return the pooled Firecrawl client, creating it on first use"""
+        if self.http_client is None:
+            self.http_client = httpx.AsyncClient(
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {self.firecrawl_api_key}"
+                },
+                timeout=FIRECRAWL_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=int(os.getenv("FIRECRAWL_MAX_CONNECTIONS", "20")),
+                    max_keepalive_connections=int(os.getenv("FIRECRAWL_MAX_KEEPALIVE_CONNECTIONS", "10")),
+                    keepalive_expiry=float(os.getenv("FIRECRAWL_KEEPALIVE_EXPIRY_SECONDS", "30"))
+                ),
+                http2=HTTP2_AVAILABLE
+            )
+        return self.http_client
+    
+    @timed_stage("total")
     async def get_job_recommendations(
         self,
         resume_text: str,
         jobs_page_url: str,
         num_jobs: int,
-        num_recommendations: int
+        num_recommendations: int,
+        shortlist_size: Optional[int] = None,
+        include_jobs: JobProjection = "full"
     ) -> JobRecommendationResponse:
         """
         Main method to get job recommendations
         """
         start_time = time.time()
         
-        try:
-            # Step 1: Scrape jobs page and extract job links
-            print(f"Scraping jobs from: {jobs_page_url}")
-            job_links = await self._extract_job_links(jobs_page_url, num_jobs)
-            
-            if not job_links:
+        with track_usage() as usage:
+            try:
+                # Steps 1-2: Scrape jobs page, extract job links and detailed job data
+                board, job_data = await self._collect_jobs(jobs_page_url, num_jobs)
+                job_links = board.job_links
+                
+                if not job_links:
+                    return JobRecommendationResponse(
+                        success=False,
+                        message="No job links found on the provided page",
+                        total_jobs_found=0,
+                        total_jobs_analyzed=0,
+                        recommendations=[],
+                        board_fingerprint=board.fingerprint,
+                        board_unchanged=board.unchanged,
+                        token_usage=usage
+                    )
+                
+                if not job_data:
+                    return JobRecommendationResponse(
+                        success=False,
+                        message="No job data could be extracted from the job links",
+                        total_jobs_found=len(job_links),
+                        total_jobs_analyzed=0,
+                        recommendations=[],
+                        board_fingerprint=board.fingerprint,
+                        board_unchanged=board.unchanged,
+                        token_usage=usage
+                    )
+                
+                # Step 3: Generate recommendations using AI
+                print(f"Generating recommendations based on {len(job_data)} jobs...")
+                recommendations = await self._generate_recommendations(
+                    resume_text, job_data, num_recommendations, shortlist_size
+                )
+                
+                processing_time = time.time() - start_time
+                
+                return JobRecommendationResponse(
+                    success=True,
+                    message=f"Successfully analyzed {len(job_data)} jobs and generated {len(recommendations)} recommendations",
+                    total_jobs_found=len(job_links),
+                    total_jobs_analyzed=len(job_data),
+                    recommendations=recommendations,
+                    **job_fields(job_data, include_jobs),
+                    processing_time_seconds=round(processing_time, 2),
+                    board_fingerprint=board.fingerprint,
+                    board_unchanged=board.unchanged,
+                    token_usage=usage
+                )
+                
+            except Exception as e:
+                processing_time = time.time() - start_time
                 return JobRecommendationResponse(
                     success=False,
-                    message="No job links found on the provided page",
+                    message=f"Error processing request: {str(e)}",
                     total_jobs_found=0,
                     total_jobs_analyzed=0,
-                    recommendations=[]
+                    recommendations=[],
+                    processing_time_seconds=round(processing_time, 2),
+                    token_usage=usage
                 )
-            
-            # Step 2: Extract detailed job data from each link
-            print(f"Extracting detailed data from {len(job_links)} job postings...")
-            job_data = await self._extract_job_details(job_links)
-            
-            if not job_data:
-                return JobRecommendationResponse(
-                    success=False,
-                    message="No job data could be extracted from the job links",
+    
+    @timed_stage("batch_total")
+    async def get_batch_job_recommendations(
+        self,
+        resumes: List[ResumeInput],
+        jobs_page_url: str,
+        num_jobs: int,
+        num_recommendations: int,
+        shortlist_size: Optional[int] = None,
+        include_jobs: JobProjection = "full"
+    ) -> BatchJobRecommendationResponse:
+        """
+        Scrape and extract a board once, then rank it against every resume in parallel
+        """
+        start_time = time.time()
+        
+        with track_usage() as usage:
+            try:
+                board, job_data = await self._collect_jobs(jobs_page_url, num_jobs)
+                job_links = board.job_links
+                
+                if not job_data:
+                    message = "No job links found on the provided page" if not job_links else "No job data could be extracted from the job links"
+                    return BatchJobRecommendationResponse(
+                        success=False,
+                        message=message,
+                        total_jobs_found=len(job_links),
+                        total_jobs_analyzed=0,
+                        results=[],
+                        processing_time_seconds=round(time.time() - start_time, 2),
+                        board_fingerprint=board.fingerprint,
+                        board_unchanged=board.unchanged,
+                        token_usage=usage
+                    )
+                
+                # Step 3: Fan out only the ranking stage across resumes
+                print(f"Ranking {len(job_data)} jobs against {len(resumes)} resumes...")
+                results = await asyncio.gather(*[
+                    self._recommend_for_resume(
+                        resume.resume_id or str(index), resume.resume_text, job_data, num_recommendations, shortlist_size
+                    )
+                    for index, resume in enumerate(resumes)
+                ])
+                
+                succeeded = sum(1 for result in results if result.success)
+                return BatchJobRecommendationResponse(
+                    success=succeeded > 0,
+                    message=f"Analyzed {len(job_data)} jobs and generated recommendations for {succeeded}/{len(resumes)} resumes",
                     total_jobs_found=len(job_links),
+                    total_jobs_analyzed=len(job_data),
+                    results=results,
+                    **job_fields(job_data, include_jobs),
+                    processing_time_seconds=round(time.time() - start_time, 2),
+                    board_fingerprint=board.fingerprint,
+                    board_unchanged=board.unchanged,
+                    token_usage=usage
+                )
+                
+            except Exception as e:
+                return BatchJobRecommendationResponse(
+                    success=False,
+                    message=f"Error processing request: {str(e)}",
+                    total_jobs_found=0,
                     total_jobs_analyzed=0,
-                    recommendations=[]
+                    results=[],
+                    processing_time_seconds=round(time.time() - start_time, 2),
+                    token_usage=usage
                 )
-            
-            # Step 3: Generate recommendations using AI
-            print(f"Generating recommendations based on {len(job_data)} jobs...")
-            recommendations = await self._generate_recommendations(
-                resume_text, job_data, num_recommendations
+    
+    async def _recommend_for_resume(
+        self,
+        resume_id: str,
+        resume_text: str,
+        job_data: List[JobData],
+        num_recommendations: int,
+        shortlist_size: Optional[int]
+    ) -> ResumeRecommendations:
+        """Rank the shared job set for one resume in a batch"""
+        # Nested under the batch tracker, so these tokens also count towards the batch total
+        with track_usage() as usage:
+            async with self._batch_semaphore:
+                recommendations = await self._generate_recommendations(
+                    resume_text, job_data, num_recommendations, shortlist_size
+                )
+        return ResumeRecommendations(
+            resume_id=resume_id,
+            success=bool(recommendations),
+            message=f"Generated {len(recommendations)} recommendations" if recommendations else "No recommendations could be generated",
+            recommendations=recommendations,
+            token_usage=usage
+        )
+    
+    async def _collect_jobs(self, jobs_page_url: str, num_jobs: int) -> Tuple[BoardLinks, List[JobData]]:
+        """Run stages 1-2: find job links on the board and extract each posting"""
+        print(f"Scraping jobs from: {jobs_page_url}")
+        board = await self._extract_job_links(jobs_page_url, num_jobs)
+        if not board.job_links:
+            return board, []
+        
+        print(f"Extracting detailed data from {len(board.job_links)} job postings...")
+        job_data = await self._extract_job_details(board.job_links, board.unchanged)
+        return board, job_data
+    
+    async def stream_job_recommendations(
+        self,
+        resume_text: str,
+        jobs_page_url: str,
+        num_jobs: int,
+        num_recommendations: int,
+        shortlist_size: Optional[int] = None,
+        include_jobs: JobProjection = "full"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run the recommendation pipeline, yielding progress events as each stage produces results
+        """
+        start_time = time.time()
+        job_links: List[str] = []
+        job_data: List[JobData] = []
+        recommendations: List[JobRecommendation] = []
+        
+        def done(success: bool, message: str) -> Dict[str, Any]:
+            observe_duration("total", time.time() - start_time)
+            return {"event": "done", "data": {
+                "success": success,
+                "message": message,
+                "total_jobs_found": len(job_links),
+                "total_jobs_analyzed": len(job_data),
+                "total_recommendations": len(recommendations),
+                "processing_time_seconds": round(time.time() - start_time, 2),
+                "token_usage": usage.model_dump()
+            }}
+        
+        with track_usage() as usage:
+            try:
+                # Step 1: Scrape jobs page and extract job links
+                print(f"Scraping jobs from: {jobs_page_url}")
+                board = await self._extract_job_links(jobs_page_url, num_jobs)
+                job_links = board.job_links
+                yield {"event": "links", "data": {
+                    "total_jobs_found": len(job_links),
+                    "job_links": job_links,
+                    "board_fingerprint": board.fingerprint,
+                    "board_unchanged": board.unchanged
+                }}
+                
+                if not job_links:
+                    yield done(False, "No job links found on the provided page")
+                    return
+                
+                # Step 2: Emit each job as soon as its extraction finishes
+                print(f"Extracting detailed data from {len(job_links)} job postings...")
+                results: List[Optional[JobData]] = [None] * len(job_links)
+                async for index, job in self._iter_job_details(job_links, board.unchanged):
+                    if job is None:
+                        continue
+                    results[index] = job
+                    if include_jobs == "full":
+                        yield {"event": "job", "data": {"index": index, "job": job.model_dump()}}
+                    elif include_jobs == "links":
+                        yield {"event": "job", "data": {"index": index, "apply_link": job.apply_link}}
+                job_data = [job for job in results if job is not None]
+                
+                if not job_data:
+                    yield done(False, "No job data could be extracted from the job links")
+                    return
+                
+                # Step 3: Generate recommendations using AI
+                print(f"Generating recommendations based on {len(job_data)} jobs...")
+                async for recommendation in self._iter_recommendations(
+                    resume_text, job_data, num_recommendations, shortlist_size
+                ):
+                    recommendations.append(recommendation)
+                    yield {"event": "recommendation", "data": {"rank": len(recommendations), "recommendation": recommendation.model_dump()}}
+                
+                yield done(True, f"Successfully analyzed {len(job_data)} jobs and generated {len(recommendations)} recommendations")
+                
+            except Exception as e:
+                yield done(False, f"Error processing request: {str(e)}")
+    
+    async def _scrape(self, payload: Dict[str, Any], cache_ttl: Optional[float] = None) -> Dict[str, Any]:
+        """Scrape a page through Firecrawl, serving repeat requests from the scrape cache"""
+        cache_key = ScrapeCache.make_key(payload)
+        cached = await self.scrape_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        # Concurrent misses for the same payload share one upstream scrape
+        return await self.scrape_flights.do(
+            cache_key, lambda: self._scrape_and_cache(payload, cache_key, cache_ttl)
+        )
+    
+    async def _scrape_and_cache(self, payload: Dict[str, Any], cache_key: str, cache_ttl: Optional[float]) -> Dict[str, Any]:
+        # Another worker process already scraping this page will put the result in the shared cache
+        if not await self.scrape_cache.acquire_lease(cache_key, self.scrape_lease_seconds):
+            cached = await self.scrape_cache.wait_for(cache_key, timeout=self.scrape_lease_seconds)
+            if cached is not None:
+                return cached
+        
+        try:
+            data = await self._scrape_upstream(payload)
+            await self.scrape_cache.set(cache_key, data, ttl_seconds=cache_ttl)
+            return data
+        finally:
+            await self.scrape_cache.release_lease(cache_key)
+    
+    async def _scrape_upstream(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Scrape a page through Firecrawl, retrying transient failures, and return the response data"""
+        return await self.firecrawl_upstream.call(
+            lambda: self._scrape_attempt(payload), _is_retryable_firecrawl_error
+        )
+    
+    async def _scrape_attempt(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            response = await self._get_http_client().post(self.firecrawl_scrape_url, json=payload)
+        except (httpx.HTTPError, asyncio.TimeoutError) as e:
+            record_upstream_error("firecrawl", type(e).__name__)
+            raise
+        
+        await self.firecrawl_limiter.observe(response.status_code, response.headers)
+        if response.status_code != 200:
+            record_upstream_error("firecrawl", response.status_code)
+            raise FirecrawlError(f"{response.status_code} - {response.text}", response.status_code)
+        
+        result = response.json()
+        if not result.get('success'):
+            record_upstream_error("firecrawl", "unsuccessful")
+            raise FirecrawlError(result.get('message', 'Unknown error'), response.status_code)
+        
+        return result['data']
+    
+    async def _chat_completion(self, prompt: str, stage: str):
+        """Send a single-message prompt to the model, recording latency and upstream errors"""
+        with observe_stage(stage):
+            completion = await self.openai_upstream.call(
+                lambda: self._openai_attempt(prompt), _is_retryable_openai_error, cost=estimate_tokens(prompt)
             )
-            
-            processing_time = time.time() - start_time
-            
-            return JobRecommendationResponse(
-                success=True,
-                message=f"Successfully analyzed {len(job_data)} jobs and generated {len(recommendations)} recommendations",
-                total_jobs_found=len(job_links),
-                total_jobs_analyzed=len(job_data),
-                recommendations=recommendations,
-                all_jobs=job_data,
-                processing_time_seconds=round(processing_time, 2)
+        
+        record_usage(stage, completion.usage)
+        return completion
+    
+    async def _stream_chat_completion(self, prompt: str, stage: str) -> AsyncIterator[str]:
+        """Stream a single-message prompt's completion text as it is generated, recording latency, usage and upstream errors"""
+        import openai
+        
+        with observe_stage(stage):
+            # Only opening the stream is retried; once text has been yielded it can't be taken back
+            stream = await self.openai_upstream.call(
+                lambda: self._openai_attempt(prompt, stream=True), _is_retryable_openai_error, cost=estimate_tokens(prompt)
             )
-            
-        except Exception as e:
-            processing_time = time.time() - start_time
-            return JobRecommendationResponse(
-                success=False,
-                message=f"Error processing request: {str(e)}",
-                total_jobs_found=0,
-                total_jobs_analyzed=0,
-                recommendations=[],
-                processing_time_seconds=round(processing_time, 2)
+            try:
+                async for chunk in stream:
+                    # With include_usage the final chunk carries usage and no choices
+                    if chunk.usage is not None:
+                        record_usage(stage, chunk.usage)
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            except openai.APIError as e:
+                record_upstream_error("openai", type(e).__name__)
+                raise
+            finally:
+                await stream.close()
+    
+    async def _openai_attempt(self, prompt: str, stream: bool = False):
+        """One chat completion request, feeding its rate-limit headers to the limiter and recording upstream errors"""
+        import openai
+        
+        options = {"stream": True, "stream_options": {"include_usage": True}} if stream else {}
+        try:
+            response = await self.openai_client.chat.completions.with_raw_response.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": prompt}],
+                **options
             )
+        except openai.APIStatusError as e:
+            await self.openai_limiter.observe(e.status_code, e.response.headers)
+            record_upstream_error("openai", e.status_code)
+            raise
+        except (openai.APIError, asyncio.TimeoutError) as e:
+            record_upstream_error("openai", type(e).__name__)
+            raise
+        
+        await self.openai_limiter.observe(response.status_code, response.headers)
+        return response.parse()
     
-    async def _extract_job_links(self, jobs_page_url: str, num_jobs: int) -> List[str]:
-        """Extract job application links from the jobs page"""
+    async def _extract_job_links(self, jobs_page_url: str, num_jobs: int) -> BoardLinks:
+        """Extract job application links from the jobs page, reusing the last run's links if the board is unchanged"""
         try:
-            response = requests.post(
-                "https://api.firecrawl.dev/v1/scrape",
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {self.firecrawl_api_key}"
-                },
-                json={
+            with observe_stage("board_scrape"):
+                data = await self._scrape({
                     "url": jobs_page_url,
                     "formats": ["markdown"],
                     "waitFor": 2000,
                     "timeout": 30000
-                }
-            )
-            
-            if response.status_code != 200:
-                print(f"Error scraping jobs page: {response.status_code} - {response.text}")
-                return []
-            
-            result = response.json()
-            if not result.get('success'):
-                print(f"Failed to scrape jobs page: {result.get('message', 'Unknown error')}")
-                return []
-            
-            html_content = result['data']['markdown']
-            
-            # Use OpenAI to extract job links
-            prompt = f"""
-            Extract up to {num_jobs} job application links from the given markdown content.
-            Return the result as a JSON object with a single key 'apply_links' containing an array of strings (the links).
-            The output should be a valid JSON object, with no additional text.
-            Do not include any JSON markdown formatting or code block indicators.
-            Provide only the raw JSON object as the response.
-
-            Example of the expected format:
-            {{"apply_links": ["https://example.com/job1", "https://example.com/job2", ...]}}
-
-            Markdown content:
-            {html_content[:50000]}
-            """
+                }, cache_ttl=self.board_cache_ttl_seconds)
             
-            completion = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}]
-            )
+            html_content = data['markdown']
+            fingerprint = board_fingerprint(html_content, jobs_page_url)
             
-            if completion.choices:
-                response_content = completion.choices[0].message.content.strip()
-                try:
-                    result = json.loads(response_content)
-                    return result.get('apply_links', [])
-                except json.JSONDecodeError as e:
-                    print(f"Error parsing job links JSON: {str(e)}")
-                    return []
+            if self.job_store:
+                previous = await self.job_store.get_board(jobs_page_url)
+                # Reuse only if the previous run asked for enough links or found every link on the board
+                if (
+                    previous
+                    and previous["fingerprint"] == fingerprint
+                    and (len(previous["job_links"]) >= num_jobs or len(previous["job_links"]) < previous["num_jobs"])
+                ):
+                    print(f"Board unchanged since last run (fingerprint {fingerprint[:12]}), reusing job links")
+                    return BoardLinks(previous["job_links"][:num_jobs], fingerprint, True)
             
-            return []
+            job_links = await self._links_from_markdown(html_content, jobs_page_url, num_jobs)
+            if self.job_store and job_links:
+                await self.job_store.save_board(jobs_page_url, fingerprint, job_links, num_jobs)
+            return BoardLinks(job_links, fingerprint, False)
             
+        except FirecrawlError as e:
+            print(f"Error scraping jobs page: {str(e)}")
+            return BoardLinks([], None, False)
         except Exception as e:
             print(f"Error extracting job links: {str(e)}")
-            return []
+            return BoardLinks([], None, False)
     
-    async def _extract_job_details(self, job_links: List[str]) -> List[JobData]:
-        """Extract detailed job information from each job link"""
-        job_data = []
+    async def _links_from_markdown(self, html_content: str, jobs_page_url: str, num_jobs: int) -> List[str]:
+        """Find job application links in scraped board markdown"""
+        # Fast path: known ATS layouts expose postings as predictable URLs
+        ats_name, ats_links = extract_ats_links(html_content, jobs_page_url, num_jobs)
+        if ats_links:
+            self.link_extraction_counters["pattern_hits"] += 1
+            by_ats = self.link_extraction_counters["by_ats"]
+            by_ats[ats_name] = by_ats.get(ats_name, 0) + 1
+            print(f"Matched {len(ats_links)} {ats_name} job links without the LLM")
+            return ats_links
         
-        for index, link in enumerate(job_links):
+        self.link_extraction_counters["llm_fallbacks"] += 1
+        board_content = reduce_markdown(html_content, self.link_prompt_token_budget)
+        
+        # Fall back to OpenAI to extract job links
+        prompt = f"""
+        Extract up to {num_jobs} job application links from the given markdown content.
+        Return the result as a JSON object with a single key 'apply_links' containing an array of strings (the links).
+        The output should be a valid JSON object, with no additional text.
+        Do not include any JSON markdown formatting or code block indicators.
+        Provide only the raw JSON object as the response.
+
+        Example of the expected format:
+        {{"apply_links": ["https://example.com/job1", "https://example.com/job2", ...]}}
+
+        Markdown content:
+        {board_content}
+        """
+        
+        # Concurrent requests for the same board markdown share one completion
+        prompt_key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        completion = await self.link_extraction_flights.do(
+            prompt_key, lambda: self._chat_completion(prompt, "link_extraction_llm")
+        )
+        
+        if completion.choices:
+            response_content = completion.choices[0].message.content.strip()
             try:
-                response = requests.post(
-                    "https://api.firecrawl.dev/v1/scrape",
-                    headers={
-                        "Content-Type": "application/json",
-                        "Authorization": f"Bearer {self.firecrawl_api_key}"
-                    },
-                    json={
+                result = json.loads(response_content)
+                return result.get('apply_links', [])
+            except json.JSONDecodeError as e:
+                print(f"Error parsing job links JSON: {str(e)}")
+                return []
+        
+        return []
+    
+    async def _extract_job_details(self, job_links: List[str], board_unchanged: bool = False) -> List[JobData]:
+        """Extract detailed job information from each job link concurrently"""
+        results: List[Optional[JobData]] = [None] * len(job_links)
+        async for index, job in self._iter_job_details(job_links, board_unchanged):
+            results[index] = job
+        
+        # Keep input order; failed links come back as None
+        return [job for job in results if job is not None]
+    
+    async def _iter_job_details(
+        self,
+        job_links: List[str],
+        board_unchanged: bool = False
+    ) -> AsyncIterator[Tuple[int, Optional[JobData]]]:
+        """Yield (index, job) pairs as each concurrent extraction finishes"""
+        # Postings already in the job store and still fresh need no scrape; on an unchanged board any stored copy will do
+        stored = await self.job_store.get_fresh(job_links, ignore_ttl=board_unchanged) if self.job_store else {}
+        if stored:
+            print(f"Reusing {len(stored)} stored jobs, scraping {len(job_links) - len(stored)}")
+        for index, link in enumerate(job_links):
+            if link in stored:
+                yield index, stored[link]
+        
+        async def extract(index: int, link: str) -> Tuple[int, Optional[JobData]]:
+            return index, await self._extract_single_job_details(index, link, len(job_links))
+        
+        tasks = [
+            asyncio.create_task(extract(index, link))
+            for index, link in enumerate(job_links)
+            if link not in stored
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Stop outstanding scrapes if the consumer goes away (e.g. a streaming client disconnects)
+            for task in tasks:
+                task.cancel()
+    
+    def _host_semaphore(self, link: str) -> asyncio.Semaphore:
+        """Get the concurrency limiter for the host serving the given link"""
+        host = urlparse(link).netloc.lower()
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.max_concurrency_per_host)
+        return self._host_semaphores[host]
+    
+    async def _extract_single_job_details(self, index: int, link: str, total: int) -> Optional[JobData]:
+        """Extract job information from a single job link, returning None on failure"""
+        try:
+            async with self._host_semaphore(link):
+                with observe_stage("detail_scrape"):
+                    data = await self._scrape({
                         "url": link,
                         "formats": ["extract"],
                         "actions": [{
@@ -181,81 +748,209 @@ class JobRecommendationService:
                                 "required": ["job_title", "sub_division_of_organization", "key_skills", "compensation", "location", "apply_link"]
                             }
                         }
-                    }
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    if result.get('success'):
-                        job_info = result['data']['extract']
-                        job_data.append(JobData(**job_info))
-                        print(f"✓ Extracted data for job {index + 1}/{len(job_links)}")
-                    else:
-                        print(f"✗ Failed to extract data for job {index + 1}: {result.get('message', 'Unknown error')}")
-                else:
-                    print(f"✗ Error {response.status_code} for job {index + 1}")
-                    
-            except Exception as e:
-                print(f"✗ Exception for job {index + 1}: {str(e)[:100]}...")
+                    })
+            
+            job = JobData(**data['extract'])
+            print(f"✓ Extracted data for job {index + 1}/{total}")
+            if self.job_store:
+                await self.job_store.upsert(link, job)
+            return job
+            
+        except FirecrawlError as e:
+            print(f"✗ Failed to extract data for job {index + 1}: {str(e)}")
+        except Exception as e:
+            print(f"✗ Exception for job {index + 1}: {str(e)[:100]}...")
         
-        return job_data
+        return None
     
     async def _generate_recommendations(
         self,
         resume_text: str,
         job_data: List[JobData],
-        num_recommendations: int
+        num_recommendations: int,
+        shortlist_size: Optional[int] = None
     ) -> List[JobRecommendation]:
         """Generate job recommendations using AI analysis"""
+        return [
+            rec async for rec in self._iter_recommendations(resume_text, job_data, num_recommendations, shortlist_size)
+        ]
+    
+    async def _iter_recommendations(
+        self,
+        resume_text: str,
+        job_data: List[JobData],
+        num_recommendations: int,
+        shortlist_size: Optional[int] = None
+    ) -> AsyncIterator[JobRecommendation]:
+        """Generate job recommendations, yielding each one as soon as the final ranking produces it"""
         
-        # Convert job data to dict for JSON serialization
-        jobs_dict = [job.dict() for job in job_data]
+        from ranking import shortlist_jobs  # deferred: pulls in NumPy
         
-        prompt = f"""
-        Please analyze the resume and job listings, and return a JSON list of the top {num_recommendations} roles that best fit the candidate's experience and skills. 
-        Include only the job title, compensation, and apply link for each recommended role. 
-        The output should be a valid JSON array of objects in the following format, with no additional text:
-
-        [
-          {{
-            "job_title": "Job Title",
-            "compensation": "Compensation (if available, otherwise empty string)",
-            "apply_link": "Application URL",
-            "match_reason": "Brief explanation of why this job matches the candidate's background"
-          }},
-          ...
-        ]
-
-        Based on the following resume:
-        {resume_text}
-
-        And the following job listings:
-        {json.dumps(jobs_dict, indent=2)}
+        # Only the best lexical matches go to the model, best first so chunking and compaction drop the weakest
+        top_k = max(shortlist_size or self.default_shortlist_size, num_recommendations)
+        if len(job_data) > top_k:
+            print(f"Shortlisting {top_k} of {len(job_data)} jobs by lexical match")
+        job_data = shortlist_jobs(resume_text, job_data, top_k)
+        
+        if len(job_data) > self._chunk_size(num_recommendations):
+            job_data = await self._reduce_candidates(resume_text, job_data, num_recommendations)
+        
+        async for recommendation in self._iter_ranked_jobs(resume_text, job_data, num_recommendations):
+            yield recommendation
+    
+    async def _reduce_candidates(
+        self,
+        resume_text: str,
+        job_data: List[JobData],
+        num_recommendations: int
+    ) -> List[JobData]:
+        """
+        Map-reduce ranking: rank chunks in parallel and keep each chunk's winners, repeating until the
+        survivors fit in a single ranking prompt. Candidates arrive best BM25 match first and are dealt
+        round-robin, so every chunk gets an even share of strong and weak matches.
         """
+        chunk_size = self._chunk_size(num_recommendations)
+        order = {id(job): position for position, job in enumerate(job_data)}
+        candidates = job_data
+        round_number = 0
+        while len(candidates) > chunk_size:
+            num_chunks = -(-len(candidates) // chunk_size)
+            if -(-len(candidates) // num_chunks) <= num_recommendations:
+                # Every chunk would keep all of its jobs; let the final prompt's compaction trim the rest
+                print(f"Stopping map-reduce at {len(candidates)} jobs: chunks would not shrink")
+                break
+            round_number += 1
+            chunks = [candidates[i::num_chunks] for i in range(num_chunks)]
+            print(f"Ranking round {round_number}: {len(candidates)} jobs in {len(chunks)} chunks")
+            partials = await asyncio.gather(*[
+                self._rank_chunk(resume_text, chunk, num_recommendations) for chunk in chunks
+            ])
+            # Back into BM25 order so the next deal and the final compaction still see the best matches first
+            candidates = sorted((job for partial in partials for job in partial), key=lambda job: order[id(job)])
+        return candidates
+    
+    def _chunk_size(self, num_recommendations: int) -> int:
+        """RANKING_CHUNK_SIZE, raised above num_recommendations so a full chunk must drop at least one job"""
+        return max(self.ranking_chunk_size, num_recommendations + 1)
+    
+    async def _rank_chunk(
+        self,
+        resume_text: str,
+        chunk: List[JobData],
+        num_recommendations: int
+    ) -> List[JobData]:
+        """Rank one chunk and map the model's picks back to the chunk's JobData"""
+        async with self._ranking_semaphore:
+            recommendations = await self._rank_jobs(resume_text, chunk, num_recommendations)
+        
+        jobs_by_link = {job.apply_link.strip(): job for job in chunk}
+        winners = []
+        for rec in recommendations:
+            job = jobs_by_link.pop(rec.apply_link.strip(), None)
+            if job is not None:
+                winners.append(job)
+        
+        if not winners:
+            # Failed or unusable ranking: keep the chunk's best lexical matches rather than dropping it
+            return chunk[:num_recommendations]
+        return winners[:num_recommendations]
+    
+    def _build_ranking_prompt(self, resume_text: str, job_data: List[JobData], num_recommendations: int) -> str:
+        """Build the ranking prompt for a resume and a set of jobs"""
+        return build_ranking_prompt(resume_text, job_data, num_recommendations, self.job_prompt_encoding)
+    
+    def _fit_ranking_prompt(self, resume_text: str, job_data: List[JobData], num_recommendations: int) -> str:
+        """
+        Build a ranking prompt within RANKING_PROMPT_TOKEN_BUDGET, compacting instead of sending an oversize prompt:
+        first shorten the resume, then drop the lowest-ranked jobs, then list fewer skills per job, and finally cut
+        the resume to whatever room is left; a prompt still over budget is recorded as budget_exceeded
+        """
+        budget = self.ranking_prompt_token_budget
+        prompt = self._build_ranking_prompt(resume_text, job_data, num_recommendations)
+        if estimate_tokens(prompt) <= budget:
+            return prompt
+        
+        if estimate_tokens(resume_text) > self.resume_token_budget:
+            resume_text = truncate_to_tokens(resume_text, self.resume_token_budget)
+            record_compaction("ranking_llm", "shorten_resume")
+            prompt = self._build_ranking_prompt(resume_text, job_data, num_recommendations)
+        
+        dropped = 0
+        while estimate_tokens(prompt) > budget and len(job_data) > num_recommendations:
+            # Jobs arrive best lexical match first, so the tail is the cheapest to lose
+            job_data = job_data[:-1]
+            dropped += 1
+            prompt = self._build_ranking_prompt(resume_text, job_data, num_recommendations)
+        if dropped:
+            record_compaction("ranking_llm", "drop_jobs")
+        
+        max_skills = max((len(job.key_skills) for job in job_data), default=0)
+        skills_cap = max_skills
+        while estimate_tokens(prompt) > budget and skills_cap > 0:
+            # Keep every remaining job but list fewer of its skills; extraction puts the most relevant first
+            skills_cap -= 1
+            job_data = [
+                job.model_copy(update={"key_skills": job.key_skills[:skills_cap]}) if len(job.key_skills) > skills_cap else job
+                for job in job_data
+            ]
+            prompt = self._build_ranking_prompt(resume_text, job_data, num_recommendations)
+        if skills_cap < max_skills:
+            record_compaction("ranking_llm", "trim_skills")
+        
+        overflow = estimate_tokens(prompt) - budget
+        if overflow > 0:
+            resume_text = truncate_to_tokens(resume_text, max(0, estimate_tokens(resume_text) - overflow))
+            record_compaction("ranking_llm", "cut_resume")
+            prompt = self._build_ranking_prompt(resume_text, job_data, num_recommendations)
+        
+        tokens = estimate_tokens(prompt)
+        if tokens > budget:
+            # The minimum job listings alone do not fit; send anyway, but make it visible in metrics
+            record_compaction("ranking_llm", "budget_exceeded")
+            print(f"Warning: ranking prompt is ~{tokens} tokens, over budget {budget} even after compaction")
+        else:
+            print(f"Compacted ranking prompt to ~{tokens} tokens (budget {budget}, dropped {dropped} jobs, skills capped at {skills_cap})")
+        return prompt
+    
+    async def _rank_jobs(
+        self,
+        resume_text: str,
+        job_data: List[JobData],
+        num_recommendations: int
+    ) -> List[JobRecommendation]:
+        """Rank a set of jobs that fits in one prompt"""
+        return [rec async for rec in self._iter_ranked_jobs(resume_text, job_data, num_recommendations)]
+    
+    async def _iter_ranked_jobs(
+        self,
+        resume_text: str,
+        job_data: List[JobData],
+        num_recommendations: int
+    ) -> AsyncIterator[JobRecommendation]:
+        """Rank a set of jobs that fits in one prompt, yielding each recommendation as soon as the model closes its object"""
+        prompt = self._fit_ranking_prompt(resume_text, job_data, num_recommendations)
+        parser = JsonArrayStream()
+        seen = set()
+        start = time.perf_counter()
         
         try:
-            completion = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}]
-            )
-            
-            response_content = completion.choices[0].message.content.strip()
-            
-            # Remove markdown code blocks if present
-            if response_content.startswith('```json'):
-                response_content = response_content[7:]
-            if response_content.startswith('```'):
-                response_content = response_content[3:]
-            if response_content.endswith('```'):
-                response_content = response_content[:-3]
-            
-            recommendations_data = json.loads(response_content.strip())
-            
-            return [JobRecommendation(**rec) for rec in recommendations_data]
-            
-        except json.JSONDecodeError as e:
-            print(f"Error parsing recommendations JSON: {str(e)}")
-            return []
+            async for text in self._stream_chat_completion(prompt, "ranking_llm"):
+                for item in parser.feed(text):
+                    try:
+                        recommendations = recommendations_from_response([item], job_data, self.job_prompt_encoding)
+                    except (TypeError, ValueError) as e:
+                        print(f"Skipping malformed recommendation: {str(e)}")
+                        continue
+                    for recommendation in recommendations:
+                        if recommendation.apply_link in seen:
+                            continue
+                        if not seen:
+                            observe_duration("ranking_first_recommendation", time.perf_counter() - start)
+                        seen.add(recommendation.apply_link)
+                        yield recommendation
         except Exception as e:
             print(f"Error generating recommendations: {str(e)}")
-            return []
+            return
+        
+        if not seen and (parser.errors or not parser.finished):
+            print("Error parsing recommendations JSON: no complete recommendation objects in the response")
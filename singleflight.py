@@ -0,0 +1,47 @@
+"""
+Request coalescing: concurrent callers asking for the same thing share one in-flight call
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into a single upstream call"""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.counters = {"calls": 0, "executed": 0, "collapsed": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run fn() unless a call with the same key is already in flight, in which case wait for its result"""
+        self.counters["calls"] += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.counters["executed"] += 1
+        else:
+            self.counters["collapsed"] += 1
+
+        # Shield so one caller being cancelled doesn't cancel the call for everyone else
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return call counters and the number of calls currently in flight"""
+        calls = self.counters["calls"]
+        return {
+            **self.counters,
+            "in_flight": len(self._inflight),
+            "collapse_ratio": round(self.counters["collapsed"] / calls, 4) if calls else 0.0
+        }
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
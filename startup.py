@@ -0,0 +1,81 @@
+"""
+Cold-start timing: per-module import cost and time until the app is ready to serve
+"""
+
+import os
+import sys
+import time
+import builtins
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+
+class StartupReport:
+    """Collects how long each startup phase and each top-level import took"""
+
+    def __init__(self, budget_seconds: Optional[float] = None):
+        self.started = time.perf_counter()
+        self.budget_seconds = budget_seconds if budget_seconds is not None else float(
+            os.getenv("STARTUP_BUDGET_SECONDS", "3")
+        )
+        self.imports: Dict[str, float] = {}
+        self.phases: Dict[str, float] = {}
+        self.ready_seconds: Optional[float] = None
+
+    @contextmanager
+    def measure_imports(self) -> Iterator[None]:
+        """Time every module imported inside the block, attributing nested imports to the outermost one"""
+        original_import = builtins.__import__
+        depth = 0
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            nonlocal depth
+            if depth or level or name in sys.modules:
+                return original_import(name, globals, locals, fromlist, level)
+            depth += 1
+            start = time.perf_counter()
+            try:
+                return original_import(name, globals, locals, fromlist, level)
+            finally:
+                depth -= 1
+                top = name.partition(".")[0]
+                self.imports[top] = self.imports.get(top, 0.0) + time.perf_counter() - start
+
+        builtins.__import__ = timed_import
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            builtins.__import__ = original_import
+            self.phases["imports"] = self.phases.get("imports", 0.0) + time.perf_counter() - start
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a named startup phase such as service construction or the lifespan hook"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def mark_ready(self):
+        """Record time to ready and log the report, warning when it is over budget"""
+        self.ready_seconds = time.perf_counter() - self.started
+        slowest = sorted(self.imports.items(), key=lambda item: item[1], reverse=True)[:5]
+        phases = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases.items())
+        modules = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in slowest)
+        print(f"Startup: ready in {self.ready_seconds:.2f}s ({phases}); slowest imports: {modules}")
+        if self.ready_seconds > self.budget_seconds:
+            print(f"⚠️  Startup took {self.ready_seconds:.2f}s, over the {self.budget_seconds:.1f}s budget (STARTUP_BUDGET_SECONDS)")
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "ready_seconds": round(self.ready_seconds, 3) if self.ready_seconds is not None else None,
+            "budget_seconds": self.budget_seconds,
+            "within_budget": self.ready_seconds is not None and self.ready_seconds <= self.budget_seconds,
+            "phases": {name: round(seconds, 3) for name, seconds in self.phases.items()},
+            "imports": {
+                name: round(seconds, 3)
+                for name, seconds in sorted(self.imports.items(), key=lambda item: item[1], reverse=True)
+            }
+        }
@@ -156,6 +156,32 @@ def test_simple_demo():
         print(f"❌ Simple test error: {str(e)}")
     print()
 
+def test_include_jobs_demo():
+    """Test the include_jobs projection on the demo endpoint"""
+    print("✂️  Testing include_jobs projection (demo mode)...")
+    
+    for include_jobs, field in (("full", "all_jobs"), ("links", "job_links"), ("none", None)):
+        payload = {
+            "resume_text": SAMPLE_RESUME,
+            "num_jobs": 5,
+            "num_recommendations": 2,
+            "include_jobs": include_jobs
+        }
+        try:
+            response = requests.post(f"{BASE_URL}/recommend-jobs-demo", json=payload, timeout=60)
+            if response.status_code != 200:
+                print(f"❌ include_jobs={include_jobs} failed: {response.text}")
+                continue
+            result = response.json()
+            present = [name for name in ("all_jobs", "job_links") if result.get(name) is not None]
+            if present == ([field] if field else []):
+                print(f"✅ include_jobs={include_jobs}: {present or 'no job list'} ({len(response.content)} bytes)")
+            else:
+                print(f"❌ include_jobs={include_jobs}: unexpected fields {present}")
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Error with include_jobs={include_jobs}: {str(e)}")
+    print()
+
 def test_job_recommendations():
     """Test the job recommendations endpoint (real scraping)"""
     print("🌐 Testing job recommendations endpoint (real scraping)...")
@@ -231,6 +257,114 @@ def test_with_different_parameters():
     
     print()
 
+def test_stream_recommendations():
+    """Test the streaming endpoint, printing each NDJSON event as it arrives"""
+    print("📡 Testing streaming recommendations endpoint...")
+    
+    payload = {
+        "resume_text": SAMPLE_RESUME,
+        "num_jobs": 3,
+        "num_recommendations": 2
+    }
+    
+    try:
+        start = time.time()
+        with requests.post(f"{BASE_URL}/recommend-jobs/stream", json=payload, stream=True, timeout=300) as response:
+            print(f"Status: {response.status_code}")
+            if response.status_code != 200:
+                print(f"❌ Stream failed: {response.text}")
+                print()
+                return
+            
+            events: Dict[str, int] = {}
+            done: Dict[str, Any] = {}
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                events[event["event"]] = events.get(event["event"], 0) + 1
+                if event["event"] == "recommendation":
+                    rec = event["data"]["recommendation"]
+                    print(f"   {time.time() - start:.1f}s #{event['data']['rank']}: {rec['job_title']}")
+                elif event["event"] == "done":
+                    done = event["data"]
+                    print(f"   {time.time() - start:.1f}s done: {done['message']}")
+        
+        print(f"Events received: {events}")
+        if events.get("done") and done["success"]:
+            print("✅ Stream completed!")
+        else:
+            print("❌ Stream did not complete successfully")
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Error streaming: {str(e)}")
+    print()
+
+def test_background_run():
+    """Test submitting a background run and polling it until the result is ready"""
+    print("🕒 Testing background runs endpoint...")
+    
+    payload = {
+        "resume_text": SAMPLE_RESUME,
+        "num_jobs": 3,
+        "num_recommendations": 2
+    }
+    
+    try:
+        response = requests.post(f"{BASE_URL}/runs", json=payload, timeout=30)
+        print(f"Status: {response.status_code}")
+        if response.status_code != 202:
+            print(f"❌ Run submission failed: {response.text}")
+            print()
+            return
+        
+        run_id = response.json()["run_id"]
+        print(f"Run id: {run_id}")
+        status = response.json()["status"]
+        deadline = time.time() + 300
+        while status in ("queued", "running") and time.time() < deadline:
+            time.sleep(1)
+            status = requests.get(f"{BASE_URL}/runs/{run_id}", timeout=10).json()["status"]
+        print(f"Final status: {status}")
+        
+        response = requests.get(f"{BASE_URL}/runs/{run_id}/result", timeout=30)
+        if response.status_code == 200:
+            result = response.json()
+            print(f"✅ Run result: {result['message']}")
+            print(f"Recommendations: {len(result['recommendations'])}")
+        else:
+            print(f"❌ Run result failed ({response.status_code}): {response.text}")
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Error with background run: {str(e)}")
+    print()
+
+def test_batch_recommendations():
+    """Test ranking one board against several resumes in a single request"""
+    print("📦 Testing batch recommendations endpoint...")
+    
+    payload = {
+        "resumes": [
+            {"resume_id": "hris-analyst", "resume_text": SAMPLE_RESUME},
+            {"resume_id": "software-engineer", "resume_text": SAMPLE_RESUME.replace("HRIS Analyst", "Software Engineer")}
+        ],
+        "num_jobs": 3,
+        "num_recommendations": 2
+    }
+    
+    try:
+        response = requests.post(f"{BASE_URL}/recommend-jobs/batch", json=payload, timeout=600)
+        print(f"Status: {response.status_code}")
+        if response.status_code == 200:
+            result = response.json()
+            print(f"✅ {result['message']}")
+            for resume in result['results']:
+                titles = " | ".join(rec['job_title'] for rec in resume['recommendations'])
+                print(f"   {resume['resume_id']}: {titles or resume['message']}")
+        else:
+            print(f"❌ Batch failed: {response.text}")
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Error with batch request: {str(e)}")
+    print()
+
 def run_all_tests():
     """Run all tests"""
     print("🚀 Job Recommendation API Test Suite")
@@ -252,8 +386,12 @@ def run_all_tests():
         test_root_endpoint()
         test_simple_demo()
         test_job_recommendations_demo()
+        test_include_jobs_demo()
         test_job_recommendations()
         test_with_different_parameters()
+        test_stream_recommendations()
+        test_background_run()
+        test_batch_recommendations()
         
         print("✅ All tests completed!")
         return True
@@ -275,6 +413,7 @@ def run_demo_only():
     
     try:
         test_simple_demo()
+        test_include_jobs_demo()
         print("✅ Demo test completed!")
         return True
     except Exception as e:
@@ -296,3 +435,4 @@ if __name__ == "__main__":
     print("- Use 'python test_api.py --demo' for quick testing")
     print("- Use 'python test_api.py' for full test suite")
     print("- Demo endpoint always works (no Firecrawl credits needed)")
+    print("- Start the server against loadtest/stub_upstreams.py to run the scraping tests offline")
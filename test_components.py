@@ -0,0 +1,542 @@
+#!/usr/bin/env python3
+"""
+Behaviour checks for the parsing and ranking helpers; no server or API keys needed
+"""
+
+import os
+import sys
+import tempfile
+import gzip
+import time
+import asyncio
+import traceback
+from typing import Dict, List, Optional
+
+from compression import CompressionMiddleware, negotiate_encoding
+from job_store import board_fingerprint, normalize_link
+from json_stream import JsonArrayStream
+from link_extractors import extract_ats_links
+from markdown_reducer import reduce_markdown
+from models import JobData, JobRecommendation, JobRecommendationRequest, JobRecommendationResponse
+from rate_limit import MemoryBucketStore, RateLimiter, _adjust, _take
+from runs import QueueFullError, RunManager, RunStore
+from resilience import RETRYABLE_STATUSES, CircuitOpenError, Upstream
+
+# Keep caches, stores and bucket state in memory so checks leave nothing on disk
+IN_MEMORY_ENV = {"SCRAPE_CACHE_DIR": "", "JOB_STORE_PATH": "", "RATE_LIMIT_STATE_PATH": "", "RUN_STORE_PATH": ""}
+
+def make_service(**env: str):
+    """A JobRecommendationService built with in-memory state and the given environment overrides"""
+    from services import JobRecommendationService
+    overrides: Dict[str, str] = {**IN_MEMORY_ENV, **env}
+    previous = {name: os.environ.get(name) for name in overrides}
+    os.environ.update(overrides)
+    try:
+        return JobRecommendationService()
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+def make_jobs(titles: List[str]) -> List[JobData]:
+    return [
+        JobData(job_title=title, location="Remote", compensation="$100K", key_skills=[], apply_link=f"https://jobs.example.com/{index}")
+        for index, title in enumerate(titles)
+    ]
+
+def test_extract_ats_links():
+    """Known ATS layouts are canonicalized, de-duplicated and kept in page order"""
+    markdown = """
+[Home](https://example.com)
+[Research Engineer](https://jobs.ashbyhq.com/acme/0F1E2D3C-4B5A-6978-8796-A5B4C3D2E1F0)
+[Research Engineer, again](https://jobs.ashbyhq.com/acme/0f1e2d3c-4b5a-6978-8796-a5b4c3d2e1f0/application)
+[Data Scientist](https://boards.greenhouse.io/acme/jobs/4012345?gh_src=x)
+[Privacy Policy](/privacy)
+"""
+    ats, links = extract_ats_links(markdown, "https://acme.com/careers", limit=10)
+    assert ats == "ashby", ats
+    assert links == [
+        "https://jobs.ashbyhq.com/acme/0f1e2d3c-4b5a-6978-8796-a5b4c3d2e1f0/application",
+        "https://boards.greenhouse.io/acme/jobs/4012345"
+    ], links
+
+    assert extract_ats_links(markdown, None, limit=1)[1] == links[:1]
+    assert extract_ats_links("[Careers](https://acme.com/careers/engineer)", None, limit=10) == (None, [])
+
+def test_reduce_markdown():
+    """Page chrome goes, job links whose titles look like boilerplate stay, and the budget is respected"""
+    markdown = """
+![logo](https://acme.com/logo.png)
+[Sign in](https://acme.com/login)
+[Privacy Policy](https://acme.com/privacy)
+## Legal
+[Privacy Counsel](https://jobs.ashbyhq.com/acme/1)
+## Design
+[Accessibility Design Lead](https://jobs.ashbyhq.com/acme/2)
+Some long paragraph about the company culture that is not near any link at all and should not be kept.
+Another paragraph about the company culture that is not near any link either.
+Yet another paragraph that sits too far above the next link to be context.
+## Engineering
+[Research Engineer](https://jobs.ashbyhq.com/acme/3)
+© 2025 Acme, all rights reserved
+"""
+    reduced = reduce_markdown(markdown, token_budget=1000)
+    assert reduced.splitlines() == [
+        "## Legal",
+        "[Privacy Counsel](https://jobs.ashbyhq.com/acme/1)",
+        "## Design",
+        "[Accessibility Design Lead](https://jobs.ashbyhq.com/acme/2)",
+        "Yet another paragraph that sits too far above the next link to be context.",
+        "## Engineering",
+        "[Research Engineer](https://jobs.ashbyhq.com/acme/3)"
+    ], reduced
+
+    tight = reduce_markdown(markdown, token_budget=30)
+    assert "## Legal" not in tight and tight.startswith("[Privacy Counsel]"), tight
+
+    # Hosts that merely end in a social domain, and job slugs that share words with page chrome
+    slugs = reduce_markdown("""
+[Follow us](https://x.com/acme)
+[Careers on LinkedIn](https://www.linkedin.com/company/acme/jobs)
+[Cookie settings](https://careers.example.com/#cookies)
+[Legal notice](https://careers.example.com/legal/imprint)
+## Privacy Counsel
+[Apply](https://careers.example.com/jobs/privacy-counsel)
+[Accessibility Design Lead](https://careers.example.com/jobs/accessibility-design-lead)
+[Studio Engineer](https://jobs.netflix.com/jobs/312345)
+[Sales Engineer](https://www.dropbox.com/jobs/listing/5512345)
+[Software Engineer](https://jobs.example.com/1)
+""", token_budget=1000)
+    assert "Cookie settings" not in slugs and "Legal notice" not in slugs, slugs
+    assert slugs.splitlines()[-6:] == [
+        "## Privacy Counsel",
+        "[Apply](https://careers.example.com/jobs/privacy-counsel)",
+        "[Accessibility Design Lead](https://careers.example.com/jobs/accessibility-design-lead)",
+        "[Studio Engineer](https://jobs.netflix.com/jobs/312345)",
+        "[Sales Engineer](https://www.dropbox.com/jobs/listing/5512345)",
+        "[Software Engineer](https://jobs.example.com/1)"
+    ], slugs
+
+def test_reduce_candidates():
+    """Map-reduce ranking terminates, spreads the best BM25 matches across chunks and keeps them to the final prompt"""
+    service = make_service(RANKING_CHUNK_SIZE="5")
+    chunk_sizes: List[int] = []
+
+    async def failed_ranking(resume_text, job_data, num_recommendations):
+        # Every chunk falls back to its first num_recommendations jobs
+        chunk_sizes.append(len(job_data))
+        return []
+
+    async def first_picks(resume_text, job_data, num_recommendations):
+        for job in job_data[:num_recommendations]:
+            yield JobRecommendation(job_title=job.job_title, compensation=job.compensation, apply_link=job.apply_link, match_reason="fit")
+
+    service._rank_jobs = failed_ranking
+    service._iter_ranked_jobs = first_picks
+    jobs = make_jobs([f"Account Executive {index}" for index in range(11)] + ["Python Engineer"])
+
+    recommendations = asyncio.run(asyncio.wait_for(
+        service._generate_recommendations("Python engineer", jobs, num_recommendations=5, shortlist_size=12), timeout=10
+    ))
+    assert len(recommendations) == 5, recommendations
+    assert recommendations[0].job_title == "Python Engineer", recommendations
+    assert chunk_sizes and max(chunk_sizes) == 6, chunk_sizes
+
+    # The best BM25 matches are dealt across chunks rather than competing in the first one
+    service = make_service(RANKING_CHUNK_SIZE="6")
+    first_round: List[List[str]] = []
+
+    async def record_chunks(resume_text, job_data, num_recommendations):
+        if len(first_round) < 4:
+            first_round.append([job.job_title for job in job_data])
+        return []
+
+    service._rank_jobs = record_chunks
+    service._iter_ranked_jobs = first_picks
+    jobs = make_jobs([f"Account Executive {index}" for index in range(20)] + [f"Python Engineer {index}" for index in range(4)])
+
+    recommendations = asyncio.run(asyncio.wait_for(
+        service._generate_recommendations("Python engineer", jobs, num_recommendations=3, shortlist_size=24), timeout=10
+    ))
+    assert len(first_round) == 4, first_round
+    assert all(sum(title.startswith("Python") for title in chunk) == 1 for chunk in first_round), first_round
+    assert all(rec.job_title.startswith("Python") for rec in recommendations), recommendations
+
+def test_fit_ranking_prompt():
+    """Skills are trimmed when the minimum job listings overflow the budget, and a prompt that still won't fit is recorded"""
+    from token_utils import estimate_tokens
+    from prometheus_client import REGISTRY
+
+    def compactions(action: str) -> float:
+        return REGISTRY.get_sample_value("prompt_compactions_total", {"call": "ranking_llm", "action": action}) or 0.0
+
+    jobs = [
+        job.model_copy(update={"key_skills": [f"Skill {index} {skill}" for skill in range(30)]})
+        for index, job in enumerate(make_jobs([f"Engineer {index}" for index in range(5)]))
+    ]
+    full = make_service(RANKING_PROMPT_TOKEN_BUDGET="100000")._fit_ranking_prompt("Python engineer", jobs, 5)
+    trim_before, exceeded_before = compactions("trim_skills"), compactions("budget_exceeded")
+
+    service = make_service(RANKING_PROMPT_TOKEN_BUDGET=str(estimate_tokens(full) // 2))
+    prompt = service._fit_ranking_prompt("Python engineer", jobs, 5)
+    assert estimate_tokens(prompt) <= service.ranking_prompt_token_budget, estimate_tokens(prompt)
+    assert all(f"Engineer {index}" in prompt for index in range(5)), prompt
+    assert compactions("trim_skills") == trim_before + 1 and compactions("budget_exceeded") == exceeded_before
+
+    service = make_service(RANKING_PROMPT_TOKEN_BUDGET="10")
+    prompt = service._fit_ranking_prompt("Python engineer", jobs, 5)
+    assert estimate_tokens(prompt) > 10 and compactions("budget_exceeded") == exceeded_before + 1
+
+def test_json_array_stream():
+    """Objects come out as soon as they close, however the text is chunked, ignoring fences and nested brackets"""
+    text = '```json\n[{"id": 1, "match_reason": "Knows \\"Spark\\" {and} [SQL]"}, {"id": 2, "tags": [{"a": 1}]}, 7]\n```'
+    for size in (1, 3, len(text)):
+        parser = JsonArrayStream()
+        objects = []
+        for start in range(0, len(text), size):
+            objects.extend(parser.feed(text[start:start + size]))
+        assert objects == [{"id": 1, "match_reason": 'Knows "Spark" {and} [SQL]'}, {"id": 2, "tags": [{"a": 1}]}], objects
+        assert parser.finished and parser.errors == 0
+
+    parser = JsonArrayStream()
+    assert parser.feed('[{"id": 1}, {"id": 2, "match') == [{"id": 1}]
+    assert not parser.finished
+
+    parser = JsonArrayStream()
+    assert parser.feed('[{"id": 1,}, {"id": 2}]') == [{"id": 2}]
+    assert parser.errors == 1
+
+def test_token_bucket():
+    """Buckets refill at their rate, header syncs keep earned refill, and unlimited limiters only wait on blocks"""
+    bucket = [("openai:requests", 2.0, 2.0, 1.0)]
+    wait, states = _take(bucket, {}, now=100.0)
+    assert wait == 0 and states["openai:requests"]["tokens"] == 1.0
+    wait, states = _take(bucket, states, now=100.0)
+    assert wait == 0 and states["openai:requests"]["tokens"] == 0.0
+    wait, _ = _take(bucket, states, now=100.0)
+    assert wait == 0.5, wait
+    wait, _ = _take(bucket, states, now=100.5)
+    assert wait == 0
+
+    # Half a second at 2/s refills one token before the upstream's count is applied
+    state = _adjust(states["openai:requests"], 2.0, 2.0, remaining=5, blocked_until=None, now=100.5)
+    assert state["tokens"] == 1.0, state
+    state = _adjust(states["openai:requests"], 2.0, 2.0, remaining=0, blocked_until=103.0, now=100.5)
+    assert state["tokens"] == 0.0 and state["blocked_until"] == 103.0
+    wait, _ = _take(bucket, {"openai:requests": state}, now=101.0)
+    assert wait == 2.0, wait
+
+    class CountingStore(MemoryBucketStore):
+        takes = 0
+        block_reads = 0
+
+        def take(self, requests):
+            CountingStore.takes += 1
+            return super().take(requests)
+
+        def blocked_until(self, names):
+            CountingStore.block_reads += 1
+            return super().blocked_until(names)
+
+    async def exercise_unlimited():
+        # Two limiters on one store stand in for two workers sharing the SQLite file
+        store = CountingStore()
+        limiter, other_worker = RateLimiter("stub", store), RateLimiter("stub", store)
+        for _ in range(3):
+            await limiter.acquire()
+        await limiter.observe(200, {"x-ratelimit-remaining-requests": "99"})
+        assert CountingStore.takes == 0 and CountingStore.block_reads == 1, (CountingStore.takes, CountingStore.block_reads)
+
+        await other_worker.observe(429, {"retry-after-ms": "300"})
+        await asyncio.sleep(0.1)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await limiter.acquire()
+        assert loop.time() - start >= 0.15 and CountingStore.takes >= 1, (loop.time() - start, CountingStore.takes)
+
+    asyncio.run(exercise_unlimited())
+
+class StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+def retryable_status(error: BaseException) -> bool:
+    return isinstance(error, StatusError) and error.status_code in RETRYABLE_STATUSES
+
+def scripted(*outcomes):
+    """An upstream call that plays back outcomes in order: a status code to raise, or (delay, value) to return"""
+    calls: List[int] = []
+
+    async def fn():
+        outcome = outcomes[min(len(calls), len(outcomes) - 1)]
+        calls.append(1)
+        if isinstance(outcome, int):
+            raise StatusError(outcome)
+        await asyncio.sleep(outcome[0])
+        return outcome[1]
+
+    return fn, calls
+
+def test_upstream_retries():
+    """Retryable statuses are retried with bounded full-jitter backoff; client errors are raised at once"""
+    upstream = Upstream("stub", base_delay=0.001, max_delay=0.004)
+    fn, calls = scripted(503, (0, "ok"))
+    assert asyncio.run(upstream.call(fn, retryable_status)) == "ok"
+    assert len(calls) == 2 and upstream.counters["retries"] == 1
+
+    fn, calls = scripted(400, (0, "ok"))
+    try:
+        asyncio.run(upstream.call(fn, retryable_status))
+        raise AssertionError("400 should not be retried")
+    except StatusError as e:
+        assert e.status_code == 400 and len(calls) == 1
+    assert upstream.breaker.failures == 0
+
+    fn, calls = scripted(429)
+    try:
+        asyncio.run(upstream.call(fn, retryable_status))
+        raise AssertionError("429 should fail after max_attempts")
+    except StatusError:
+        assert len(calls) == upstream.max_attempts == 3
+
+    delays = [upstream.backoff(attempt) for attempt in (1, 2, 3, 4, 5) for _ in range(50)]
+    assert all(0 <= delay <= 0.004 for delay in delays)
+    assert all(0 <= upstream.backoff(1) <= 0.001 for _ in range(50))
+
+def test_circuit_breaker():
+    """N failures open the breaker and reject calls; after the reset exactly one trial call goes through"""
+    upstream = Upstream("stub", max_attempts=1, failure_threshold=2, reset_seconds=0.05)
+    fn, calls = scripted(503)
+    for _ in range(2):
+        try:
+            asyncio.run(upstream.call(fn, retryable_status))
+        except StatusError:
+            pass
+    assert upstream.breaker.state == "open" and len(calls) == 2
+
+    try:
+        asyncio.run(upstream.call(fn, retryable_status))
+        raise AssertionError("open breaker should reject")
+    except CircuitOpenError:
+        assert len(calls) == 2 and upstream.breaker.counters["rejected"] == 1
+
+    time.sleep(0.06)
+    trial, trial_calls = scripted((0.02, "ok"))
+
+    async def two_callers():
+        return await asyncio.gather(
+            upstream.call(trial, retryable_status), upstream.call(trial, retryable_status), return_exceptions=True
+        )
+
+    results = asyncio.run(two_callers())
+    assert len(trial_calls) == 1, trial_calls
+    assert sorted(type(result).__name__ for result in results) == ["CircuitOpenError", "str"], results
+    assert upstream.breaker.state == "closed"
+
+def test_hedged_requests():
+    """A slow attempt is hedged once: the faster copy wins, the other is cancelled, and hedges need a rate permit"""
+    def hedging_upstream(limiter=None) -> Upstream:
+        upstream = Upstream("stub", hedge_percentile=50, limiter=limiter)
+        for _ in range(20):
+            upstream.latency.add(0.01)
+        return upstream
+
+    upstream = hedging_upstream()
+    fn, calls = scripted((0.5, "primary"), (0.01, "hedge"))
+    assert asyncio.run(upstream.call(fn, retryable_status)) == "hedge"
+    assert len(calls) == 2 and upstream.counters["hedges"] == 1 and upstream.counters["hedge_wins"] == 1
+
+    fn, calls = scripted((0.03, "primary"), (0.5, "hedge"))
+    assert asyncio.run(upstream.call(fn, retryable_status)) == "primary"
+    assert len(calls) == 2 and upstream.counters["hedges"] == 2 and upstream.counters["hedge_wins"] == 1
+
+    # One request per second: the primary takes the only permit, so the hedge is skipped
+    upstream = hedging_upstream(RateLimiter("stub", MemoryBucketStore(), requests_per_second=1))
+    fn, calls = scripted((0.05, "primary"), (0.01, "hedge"))
+    assert asyncio.run(upstream.call(fn, retryable_status)) == "primary"
+    assert len(calls) == 1 and upstream.counters["hedges_skipped"] == 1
+
+def test_negotiate_encoding():
+    """q-values, q=0 refusals and the wildcard pick the encoding; br is only offered when brotli is installed"""
+    assert negotiate_encoding("gzip, deflate, br", brotli_available=True) == "br"
+    assert negotiate_encoding("br;q=0.5, gzip", brotli_available=True) == "gzip"
+    assert negotiate_encoding("gzip;q=0, *", brotli_available=True) == "br"
+    assert negotiate_encoding("gzip;q=0, *", brotli_available=False) is None
+    assert negotiate_encoding("br", brotli_available=False) is None
+    assert negotiate_encoding("br, gzip;q=0.5", brotli_available=False) == "gzip"
+    assert negotiate_encoding("identity", brotli_available=True) is None
+    assert negotiate_encoding("", brotli_available=True) is None
+
+def run_asgi(app, accept_encoding: str = "gzip", sent: Optional[List[dict]] = None) -> List[dict]:
+    """Send one GET through an ASGI app and return every message it sent"""
+    sent = [] if sent is None else sent
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    asyncio.run(app(scope, receive, send))
+    return sent
+
+def single_body_app(body: bytes, content_type: bytes = b"application/json"):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+        await send({"type": "http.response.body", "body": body, "more_body": False})
+    return app
+
+def header(message: dict, name: bytes):
+    return dict(message["headers"]).get(name)
+
+def test_compression_middleware():
+    """Buffered bodies are compressed with Vary set; small, streamed and NDJSON/SSE bodies pass through unbuffered"""
+    body = b'{"jobs": "' + b"x" * 4000 + b'"}'
+    start, message = run_asgi(CompressionMiddleware(single_body_app(body)))
+    assert header(start, b"content-encoding") == b"gzip" and header(start, b"vary") == b"Accept-Encoding"
+    assert gzip.decompress(message["body"]) == body and header(start, b"content-length") == str(len(message["body"])).encode()
+
+    start, message = run_asgi(CompressionMiddleware(single_body_app(b'{"ok": true}')))
+    assert header(start, b"content-encoding") is None and header(start, b"vary") == b"Accept-Encoding"
+    assert message["body"] == b'{"ok": true}'
+
+    start, message = run_asgi(CompressionMiddleware(single_body_app(body, b"application/x-ndjson")))
+    assert header(start, b"content-encoding") is None and message["body"] == body
+
+    start, message = run_asgi(CompressionMiddleware(single_body_app(body)), accept_encoding="identity")
+    assert header(start, b"content-encoding") is None and message["body"] == body
+
+    # A multi-message body must reach the client message by message, not after the app finishes
+    delivered_before_second_chunk: List[int] = []
+    sent: List[dict] = []
+
+    async def streaming_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body, "more_body": True})
+        delivered_before_second_chunk.append(len(sent))
+        await send({"type": "http.response.body", "body": body, "more_body": False})
+
+    run_asgi(CompressionMiddleware(streaming_app), sent=sent)
+    assert delivered_before_second_chunk == [2], delivered_before_second_chunk
+    assert header(sent[0], b"content-encoding") is None and [m["body"] for m in sent[1:]] == [body, body]
+
+def test_normalize_link():
+    """Tracking params, trailing slashes, host case, fragments and param order don't make a posting new"""
+    canonical = "https://boards.greenhouse.io/acme/jobs/4012345?gh_jid=4012345"
+    for variant in (
+        "https://boards.greenhouse.io/acme/jobs/4012345?gh_jid=4012345",
+        "https://Boards.Greenhouse.IO/acme/jobs/4012345/?gh_jid=4012345",
+        "HTTPS://boards.greenhouse.io/acme/jobs/4012345?utm_source=x&gh_jid=4012345&utm_medium=email",
+        "https://boards.greenhouse.io/acme/jobs/4012345?gh_src=abc&gh_jid=4012345#app",
+        "  https://boards.greenhouse.io/acme/jobs/4012345?ref=home&source=LinkedIn&gh_jid=4012345  "
+    ):
+        assert normalize_link(variant) == canonical, (variant, normalize_link(variant))
+
+    # Path case and real query params still distinguish postings
+    assert normalize_link("https://jobs.lever.co/Acme/123") != normalize_link("https://jobs.lever.co/acme/123")
+    assert normalize_link("https://acme.com/jobs?id=1") != normalize_link("https://acme.com/jobs?id=2")
+    assert normalize_link("https://acme.com/jobs?b=2&a=1") == "https://acme.com/jobs?a=1&b=2"
+    assert normalize_link("https://acme.com/") == "https://acme.com/"
+
+def test_board_fingerprint():
+    """The fingerprint ignores link order, duplicates, tracking params and link text, but not the link set"""
+    board = """
+[Research Engineer](https://jobs.ashbyhq.com/acme/1?utm_source=careers)
+[Data Scientist](/jobs/2)
+[Designer](https://jobs.ashbyhq.com/acme/3)
+"""
+    reordered = """
+Open roles, updated daily
+[Designer, Brand](https://jobs.ashbyhq.com/acme/3/)
+[Data Scientist](https://acme.com/jobs/2#top)
+[Research Engineer](https://jobs.ashbyhq.com/acme/1?utm_source=newsletter&utm_campaign=june)
+[Research Engineer](https://jobs.ashbyhq.com/acme/1)
+"""
+    fingerprint = board_fingerprint(board, "https://acme.com/careers")
+    assert board_fingerprint(reordered, "https://acme.com/careers") == fingerprint
+    assert board_fingerprint(board + "[New role](https://jobs.ashbyhq.com/acme/4)", "https://acme.com/careers") != fingerprint
+    assert board_fingerprint(board.replace("/acme/3", "/acme/5"), "https://acme.com/careers") != fingerprint
+
+def test_run_submit():
+    """The 202 body is the queued status even when a worker picks the run up at once, and the store saw it queued first"""
+    class InstantService:
+        async def get_job_recommendations(self, **kwargs):
+            return JobRecommendationResponse(success=True, message="done", total_jobs_found=0, total_jobs_analyzed=0, recommendations=[])
+
+    class RecordingStore(RunStore):
+        def __init__(self, path):
+            super().__init__(path)
+            self.saved: List[str] = []
+
+        async def save(self, run, result=None):
+            self.saved.append(run.status)
+            await super().save(run, result)
+
+    async def exercise():
+        with tempfile.TemporaryDirectory() as directory:
+            store = RecordingStore(os.path.join(directory, "runs.db"))
+            manager = RunManager(InstantService(), num_workers=1, max_queue=1, store=store)
+            await manager.start()
+            request = JobRecommendationRequest(resume_text="x" * 100)
+            try:
+                queued = await manager.submit(request)
+                assert queued.status == "queued" and queued.started_at is None, queued
+                for _ in range(100):
+                    if (await manager.get_status(queued.run_id)).status == "completed":
+                        break
+                    await asyncio.sleep(0.01)
+                assert queued.status == "queued" and store.saved == ["queued", "running", "completed"], store.saved
+                assert (await store.get_status(queued.run_id)).status == "completed"
+
+                # With the only worker busy and one run waiting, the next submit is refused
+                manager._queue.put_nowait("placeholder")
+                try:
+                    await manager.submit(request)
+                    raise AssertionError("full queue should refuse runs")
+                except QueueFullError:
+                    pass
+            finally:
+                await manager.stop()
+
+    asyncio.run(exercise())
+
+CHECKS = [
+    test_extract_ats_links,
+    test_reduce_markdown,
+    test_reduce_candidates,
+    test_fit_ranking_prompt,
+    test_json_array_stream,
+    test_token_bucket,
+    test_upstream_retries,
+    test_circuit_breaker,
+    test_hedged_requests,
+    test_negotiate_encoding,
+    test_compression_middleware,
+    test_normalize_link,
+    test_board_fingerprint,
+    test_run_submit
+]
+
+def run_all_checks() -> bool:
+    """Run every check, printing one line per check"""
+    print("🧪 Component behaviour checks")
+    print("=" * 30)
+    failures = 0
+    for check in CHECKS:
+        try:
+            check()
+            print(f"✅ {check.__name__}")
+        except Exception:
+            failures += 1
+            print(f"❌ {check.__name__}")
+            traceback.print_exc()
+    print()
+    print(f"{len(CHECKS) - failures}/{len(CHECKS)} checks passed")
+    return failures == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_checks() else 1)
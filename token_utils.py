@@ -0,0 +1,46 @@
+"""
+Token counting helpers for prompt budgeting
+"""
+
+import math
+from functools import lru_cache
+from typing import Optional
+
+# Rough characters-per-token ratio for English/markdown text with OpenAI tokenizers
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def _get_encoder(model: str):
+    """Load a tiktoken encoder if tiktoken is installed and its vocabulary is available"""
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        # tiktoken is optional, and it downloads vocabularies on first use which may be blocked
+        return None
+
+
+def estimate_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """Count tokens exactly with tiktoken when available, otherwise estimate from length"""
+    encoder = _get_encoder(model)
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "gpt-4o-mini") -> str:
+    """Cut text down to at most max_tokens tokens"""
+    encoder = _get_encoder(model)
+    if encoder is not None:
+        tokens = encoder.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return encoder.decode(tokens[:max_tokens])
+    return text[:max_tokens * CHARS_PER_TOKEN]
+
+
+def tokenizer_name(model: str = "gpt-4o-mini") -> Optional[str]:
+    """Name of the tokenizer used for counting, or None when falling back to estimates"""
+    encoder = _get_encoder(model)
+    return encoder.name if encoder is not None else None
@@ -0,0 +1,80 @@
+"""
+Per-request and aggregate accounting of OpenAI token usage
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from prometheus_client import Counter, Histogram
+
+from models import TokenUsage
+
+OPENAI_TOKENS = Counter(
+    "openai_tokens_total",
+    "OpenAI tokens consumed by pipeline call and token kind",
+    ["call", "kind"]
+)
+OPENAI_PROMPT_TOKENS = Histogram(
+    "openai_prompt_tokens",
+    "Prompt size in tokens per OpenAI call",
+    ["call"],
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 12000, 16000, 24000, 32000, 64000, 128000)
+)
+PROMPT_COMPACTIONS = Counter(
+    "prompt_compactions_total",
+    "Prompts compacted to fit their token budget, by call and action",
+    ["call", "action"]
+)
+
+
+class UsageTracker:
+    """Accumulates token usage for one request, and for its parent tracker if nested"""
+
+    def __init__(self, parent: Optional["UsageTracker"] = None):
+        self.parent = parent
+        self.usage = TokenUsage()
+
+    def add(self, prompt_tokens: int, completion_tokens: int):
+        tracker = self
+        while tracker is not None:
+            tracker.usage.prompt_tokens += prompt_tokens
+            tracker.usage.completion_tokens += completion_tokens
+            tracker.usage.total_tokens += prompt_tokens + completion_tokens
+            tracker.usage.calls += 1
+            tracker = tracker.parent
+
+
+_current_tracker: ContextVar[Optional[UsageTracker]] = ContextVar("token_usage_tracker", default=None)
+
+
+@contextmanager
+def track_usage() -> Iterator[TokenUsage]:
+    """Collect token usage for OpenAI calls made in this context, including tasks it spawns"""
+    tracker = UsageTracker(parent=_current_tracker.get())
+    token = _current_tracker.set(tracker)
+    try:
+        yield tracker.usage
+    finally:
+        _current_tracker.reset(token)
+
+
+def record_usage(call: str, completion_usage) -> None:
+    """Record the usage block of a completion against the current request and aggregate metrics"""
+    if completion_usage is None:
+        return
+
+    prompt_tokens = completion_usage.prompt_tokens or 0
+    completion_tokens = completion_usage.completion_tokens or 0
+    OPENAI_TOKENS.labels(call=call, kind="prompt").inc(prompt_tokens)
+    OPENAI_TOKENS.labels(call=call, kind="completion").inc(completion_tokens)
+    OPENAI_PROMPT_TOKENS.labels(call=call).observe(prompt_tokens)
+
+    tracker = _current_tracker.get()
+    if tracker is not None:
+        tracker.add(prompt_tokens, completion_tokens)
+
+
+def record_compaction(call: str, action: str) -> None:
+    """Count a prompt compaction step taken to stay within budget"""
+    PROMPT_COMPACTIONS.labels(call=call, action=action).inc()